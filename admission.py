@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Lower values are admitted first. Turns in a running session (responses and
+# follow-up questions) go ahead of opening questions for new sessions, so
+# trainees who are already mid-session are not starved by a wave of arrivals.
+PRIORITY_TURN = 0
+PRIORITY_OPENING = 1
+# Housekeeping such as history summaries waits behind all user-facing calls
+PRIORITY_BACKGROUND = 2
+
+class AdmissionRejected(Exception):
+    """Raised when a model call is shed instead of queued"""
+
+class AdmissionScheduler:
+    """Service-wide concurrency limit with a bounded priority queue
+
+    All methods must be used from the same event loop (the service's I/O loop).
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 64, queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        # Heap of (priority, arrival order, future handed the slot)
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        # Moving average of how long an admitted call holds its slot
+        self._service_time: Optional[float] = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    def estimated_wait(self, priority: int) -> float:
+        """Estimate how long a new call at this priority would queue
+
+        Slots free up at about ``max_concurrent`` per service time, so the
+        call is admitted after the calls ahead of it and one more release.
+        """
+        if self._service_time is None:
+            return 0.0
+        ahead = sum(1 for p, _, future in self._queue if p <= priority and not future.done())
+        return (ahead + 1) / self.max_concurrent * self._service_time
+
+    async def acquire(self, priority: int = PRIORITY_TURN):
+        """Wait for a slot, or raise AdmissionRejected if it would miss the queue deadline"""
+        start = time.monotonic()
+
+        if self.active < self.max_concurrent and not self.queue_depth:
+            self.active += 1
+            self._record_admission(start)
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"Admission queue full ({self.max_queue} waiting)")
+        if self.estimated_wait(priority) > self.queue_timeout:
+            self.rejected += 1
+            raise AdmissionRejected(f"Estimated queue wait exceeds {self.queue_timeout}s")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._arrivals), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.rejected += 1
+            raise AdmissionRejected(f"Queued longer than {self.queue_timeout}s")
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+        self._record_admission(start)
+
+    def _abandon(self, future: asyncio.Future):
+        """Leave the queue, handing back a slot if one arrived at the same moment"""
+        if future.done() and not future.cancelled():
+            self.release()
+        else:
+            future.cancel()
+
+    def release(self):
+        """Free a slot, handing it straight to the next queued call if any"""
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_TURN):
+        """Hold a slot for the duration of the block"""
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record_service_time(time.monotonic() - start)
+            self.release()
+
+    def _record_admission(self, start: float):
+        wait = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _record_service_time(self, elapsed: float):
+        if self._service_time is None:
+            self._service_time = elapsed
+        else:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, wait times and admission counters"""
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait,
+            "avg_service_time": self._service_time or 0.0
+        }
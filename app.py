@@ -1,51 +1,85 @@
 
+import time
+# Taken before the other imports, so the "imports" startup phase covers them
+IMPORTS_STARTED = time.perf_counter()
 import streamlit as st
-import json
+import os
+import uuid
 from datetime import datetime
-from models import Persona, Company, Message
+from typing import Dict, Any
+from models import Persona, Company, Message, MessageType, ResponseStatus
 from ollama_service import OllamaService
+from metrics import StartupTimings
+from backend_pool import BackendPool
+from sample_data import SAMPLE_COMPANIES
+from company_catalog import CompanyCatalog
+from transcript import Transcript
+from session_store import SessionStore, StoredTranscript, TranscriptConflict
+import session_flow
+IMPORTS_S = time.perf_counter() - IMPORTS_STARTED
 
-# Initialize Ollama service
-ollama_service = OllamaService()
+@st.cache_resource
+def get_startup_timings() -> StartupTimings:
+    return StartupTimings()
 
-# Sample companies data
-SAMPLE_COMPANIES = [
-    Company(
-        id="1",
-        name="TechFlow",
-        product="Project Management Software",
-        description="Advanced project management tool with AI-powered insights and team collaboration features.",
-        category="Software"
-    ),
-    Company(
-        id="2",
-        name="CloudSync",
-        product="Cloud Storage Platform",
-        description="Secure cloud storage with real-time synchronization and advanced sharing capabilities.",
-        category="Cloud"
-    ),
-    Company(
-        id="3",
-        name="MobileFirst",
-        product="Mobile App Development Platform",
-        description="No-code platform for creating professional mobile applications with drag-and-drop interface.",
-        category="Mobile"
-    ),
-    Company(
-        id="4",
-        name="EcommPlus",
-        product="E-commerce Analytics Dashboard",
-        description="Comprehensive analytics platform for online stores with sales tracking and customer insights.",
-        category="E-commerce"
-    ),
-    Company(
-        id="5",
-        name="GameStudio",
-        product="Game Development Engine",
-        description="Cross-platform game development engine with visual scripting and asset management.",
-        category="Gaming"
+@st.cache_resource
+def get_ollama_service() -> OllamaService:
+    """Create the Ollama service once per process and start loading the model"""
+    # OLLAMA_HOSTS is a comma-separated list of "url[=weight]" entries
+    hosts = os.environ.get("OLLAMA_HOSTS")
+    # OLLAMA_SLOTS_PER_HOST is how many calls each host (at weight 1) runs at once
+    slots = int(os.environ.get("OLLAMA_SLOTS_PER_HOST", "4"))
+    # OLLAMA_KEEP_ALIVE is how long hosts keep the model loaded after each request,
+    # as a duration ("30m") or seconds; a negative value keeps it loaded until restart
+    keep_alive = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+    # EMBEDDING_MODEL names an Ollama model for semantic cache keys; unset, they are hashed locally
+    service = OllamaService(
+        backends=BackendPool.from_spec(hosts) if hosts else None,
+        slots_per_backend=slots,
+        keep_alive=int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive,
+        embedding_model=os.environ.get("EMBEDDING_MODEL") or None
     )
-]
+    
+    # Preload the model and open pooled connections in the background, so the
+    # first session does not pay for them
+    def warmed(future):
+        try:
+            report = future.result()
+        except Exception as e:
+            print(f"Error warming up Ollama: {e}")
+            return
+        get_startup_timings().warm_up = report
+        print(f"Ollama warm-up finished in {report['total_s']:.2f}s: {report['backends']}")
+    
+    service.start_warm_up().add_done_callback(warmed)
+    return service
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Open the session database once per process"""
+    return SessionStore(os.environ.get("SESSION_DB_PATH", "sessions.db"))
+
+@st.cache_resource
+def get_company_catalog() -> CompanyCatalog:
+    """Load and index the company catalog once per process"""
+    # COMPANY_CATALOG points at a JSON or CSV catalog; the samples are used otherwise
+    path = os.environ.get("COMPANY_CATALOG")
+    return CompanyCatalog.from_file(path) if path else CompanyCatalog(SAMPLE_COMPANIES)
+
+# Initialize Ollama service, session storage and the catalog, timing each once per process
+startup = get_startup_timings()
+startup.record("imports", IMPORTS_S)
+with startup.phase("ollama_service"):
+    ollama_service = get_ollama_service()
+with startup.phase("session_store"):
+    session_store = get_session_store()
+with startup.phase("company_catalog"):
+    company_catalog = get_company_catalog()
+
+COMPANIES_PER_PAGE = 10
+# Chat messages drawn on every rerun, and older messages loaded per click
+RECENT_MESSAGES = 20
+HISTORY_PAGE_SIZE = 20
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -56,20 +90,94 @@ def initialize_session_state():
     if 'company' not in st.session_state:
         st.session_state.company = None
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = Transcript()
     if 'session_active' not in st.session_state:
         st.session_state.session_active = True
     if 'waiting_for_ai' not in st.session_state:
         st.session_state.waiting_for_ai = False
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'pending_job' not in st.session_state:
+        st.session_state.pending_job = None
+    if 'pending_kind' not in st.session_state:
+        st.session_state.pending_kind = None
+    if 'ai_error' not in st.session_state:
+        st.session_state.ai_error = None
+    if 'turn_metrics' not in st.session_state:
+        st.session_state.turn_metrics = {}
+    if 'show_metrics' not in st.session_state:
+        st.session_state.show_metrics = False
+    if 'history_pages' not in st.session_state:
+        st.session_state.history_pages = 0
+    
+    # A ?session=<id> link reopens a saved session
+    resume_id = st.query_params.get("session")
+    if resume_id and resume_id != st.session_state.session_id:
+        resume_session(resume_id)
+
+def resume_session(session_id: str):
+    """Load a saved session into session state, or drop the link if it is unknown"""
+    stored = session_store.load_session(session_id)
+    if stored is None:
+        del st.query_params["session"]
+        return
+    
+    st.session_state.session_id = session_id
+    st.session_state.persona = stored.persona
+    st.session_state.company = stored.company
+    st.session_state.messages = StoredTranscript(session_store, session_id)
+    st.session_state.session_active = stored.active
+    st.session_state.current_step = 'chat'
+    st.session_state.waiting_for_ai = False
+    st.session_state.history_pages = 0
+    
+    # Restart a generation that was in flight when the session was left
+    messages = st.session_state.messages
+    if stored.active and messages.question_count == 0:
+        start_ai_job('question', ollama_service.stream_persona_question(
+            stored.persona, stored.company, messages, session_id=session_id
+        ))
+    elif stored.active and messages[-1].type is MessageType.USER_SUGGESTION:
+        start_ai_job('turn', ollama_service.stream_turn(
+            stored.persona, stored.company, messages, session_id=session_id
+        ))
+
+def reload_transcript():
+    """Re-read a session another tab has written to, dropping this tab's unsaved message"""
+    session_id = st.session_state.session_id
+    stored = session_store.load_session(session_id)
+    st.session_state.messages = StoredTranscript(session_store, session_id)
+    st.session_state.session_active = stored.active if stored is not None else False
+    st.session_state.history_pages = 0
+    st.session_state.ai_error = "This session was changed in another tab, so it has been reloaded."
+
+def start_chat_session(company: Company):
+    """Save a new session for the chosen company and make it resumable from the URL"""
+    st.session_state.company = company
+    session_store.create_session(st.session_state.session_id, st.session_state.persona, company)
+    st.session_state.messages = StoredTranscript(session_store, st.session_state.session_id)
+    st.query_params["session"] = st.session_state.session_id
+    st.session_state.current_step = 'chat'
 
 def reset_session():
     """Reset the entire session"""
     st.session_state.current_step = 'persona'
     st.session_state.persona = None
     st.session_state.company = None
-    st.session_state.messages = []
+    st.session_state.messages = Transcript()
     st.session_state.session_active = True
     st.session_state.waiting_for_ai = False
+    if st.session_state.pending_job is not None:
+        st.session_state.pending_job.cancel()
+    st.session_state.pending_job = None
+    st.session_state.pending_kind = None
+    st.session_state.ai_error = None
+    st.session_state.turn_metrics = {}
+    st.session_state.history_pages = 0
+    ollama_service.chat_sessions.discard(st.session_state.session_id)
+    ollama_service.metrics.take_session_calls(st.session_state.session_id)
+    st.session_state.session_id = uuid.uuid4().hex
+    st.query_params.clear()
 
 def create_persona_form():
     """Create the persona creation form"""
@@ -118,25 +226,29 @@ def company_selector():
     search_term = st.text_input("🔍 Search companies or products...")
     
     # Category filter
-    categories = list(set(company.category for company in SAMPLE_COMPANIES))
-    selected_category = st.selectbox("Filter by category", ["All Categories"] + categories)
+    selected_category = st.selectbox("Filter by category", ["All Categories"] + company_catalog.categories)
     
-    # Filter companies
-    filtered_companies = SAMPLE_COMPANIES
-    if search_term:
-        filtered_companies = [
-            company for company in filtered_companies
-            if search_term.lower() in company.name.lower() or 
-               search_term.lower() in company.product.lower() or
-               search_term.lower() in company.description.lower()
-        ]
-    
-    if selected_category != "All Categories":
-        filtered_companies = [company for company in filtered_companies if company.category == selected_category]
+    # Filter companies; paging reuses the last search, and new filters start from the first page
+    filters = (search_term, selected_category)
+    if st.session_state.get('company_filters') != filters:
+        st.session_state.company_filters = filters
+        st.session_state.company_results = company_catalog.search(
+            search_term,
+            None if selected_category == "All Categories" else selected_category
+        )
+        st.session_state.company_page = 0
+    filtered_companies = st.session_state.company_results
+    page_count = max(1, -(-len(filtered_companies) // COMPANIES_PER_PAGE))
+    page = min(st.session_state.get('company_page', 0), page_count - 1)
+    page_companies = filtered_companies[page * COMPANIES_PER_PAGE:(page + 1) * COMPANIES_PER_PAGE]
     
     # Display companies
     if filtered_companies:
-        for company in filtered_companies:
+        st.caption(
+            f"Showing {page * COMPANIES_PER_PAGE + 1}-{page * COMPANIES_PER_PAGE + len(page_companies)} "
+            f"of {len(filtered_companies)} matches"
+        )
+        for company in page_companies:
             with st.container():
                 col1, col2 = st.columns([3, 1])
                 
@@ -147,65 +259,159 @@ def company_selector():
                 
                 with col2:
                     if st.button(f"Select", key=f"select_{company.id}"):
-                        st.session_state.company = company
-                        st.session_state.current_step = 'chat'
+                        start_chat_session(company)
                         st.rerun()
                 
                 st.divider()
+        
+        if page_count > 1:
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button("← Previous", disabled=page == 0):
+                    st.session_state.company_page = page - 1
+                    st.rerun()
+            with page_col:
+                st.write(f"Page {page + 1} of {page_count}")
+            with next_col:
+                if st.button("Next →", disabled=page >= page_count - 1):
+                    st.session_state.company_page = page + 1
+                    st.rerun()
     else:
         st.info("No companies found matching your criteria.")
 
 def display_message(message: Message):
     """Display a single message in the chat"""
-    if message.type == 'system':
+    if message.type is MessageType.SYSTEM:
         st.info(f"ℹ️ {message.content}")
-    elif message.type == 'persona_question':
+    elif message.type is MessageType.PERSONA_QUESTION:
         with st.chat_message("assistant", avatar="🤖"):
             st.write(f"**{st.session_state.persona.name}:** {message.content}")
-    elif message.type == 'user_suggestion':
+    elif message.type is MessageType.USER_SUGGESTION:
         with st.chat_message("user", avatar="👤"):
             st.write(f"**Your Suggestion:** {message.content}")
-    elif message.type == 'persona_response':
+    elif message.type is MessageType.PERSONA_RESPONSE:
         with st.chat_message("assistant", avatar="🤖"):
             st.write(f"**{st.session_state.persona.name}:** {message.content}")
             if message.status:
-                if message.status == 'satisfied':
+                if message.status is ResponseStatus.SATISFIED:
                     st.success("✅ Satisfied - Question answered!")
-                elif message.status == 'needs_more':
+                elif message.status is ResponseStatus.NEEDS_MORE:
                     st.warning("❓ Needs more help")
-                elif message.status == 'unclear':
+                elif message.status is ResponseStatus.UNCLEAR:
                     st.error("❌ Unclear response")
+    
+    if st.session_state.show_metrics and message.id in st.session_state.turn_metrics:
+        st.caption(st.session_state.turn_metrics[message.id])
 
-async def initialize_chat_session():
-    """Initialize the chat session with AI persona's first question"""
+def format_call_metrics(calls) -> str:
+    """One line per model call: outcome, latency breakdown and token rate"""
+    lines = []
+    for call in calls:
+        line = f"{call.endpoint} · {call.outcome} · total {call.total_s * 1000:.0f}ms"
+        if call.first_token_s is not None:
+            line += f" · first token {call.first_token_s * 1000:.0f}ms"
+        if call.outcome == 'model':
+            line += (
+                f" · queue {call.queue_s * 1000:.0f}ms · load {call.load_s * 1000:.0f}ms"
+                f" · prompt {call.prompt_tokens} tok in {call.prompt_eval_s * 1000:.0f}ms"
+                f" · {call.eval_tokens} tok at {call.tokens_per_s:.1f} tok/s"
+            )
+        lines.append(line)
+    return "  \n".join(lines)
+
+def initialize_chat_session():
+    """Initialize the chat session and start generating the AI persona's first question"""
     if not st.session_state.messages:
         # Add system message
-        system_msg = Message(
-            id=str(datetime.now().timestamp()),
-            type='system',
-            content=f"Session started: {st.session_state.persona.name} ({st.session_state.persona.role}) will ask questions about {st.session_state.company.product} from {st.session_state.company.name}. Provide helpful suggestions to assist them.",
-            timestamp=datetime.now()
-        )
-        st.session_state.messages.append(system_msg)
-        
-        # Generate initial question
         try:
-            initial_question = await ollama_service.generate_persona_question(
-                st.session_state.persona, 
-                st.session_state.company, 
-                []
-            )
-            
-            question_msg = Message(
-                id=str(datetime.now().timestamp() + 1),
-                type='persona_question',
-                content=initial_question,
-                timestamp=datetime.now()
+            session_flow.add_session_started(st.session_state.messages, st.session_state.persona, st.session_state.company)
+        except TranscriptConflict:
+            # Another tab opened the session first and is generating its question
+            reload_transcript()
+            return
+        
+        # Generate initial question in the background
+        start_ai_job('question', ollama_service.stream_persona_question(
+            st.session_state.persona, 
+            st.session_state.company, 
+            [],
+            session_id=st.session_state.session_id
+        ))
+
+def start_ai_job(kind: str, stream):
+    """Hand a persona generation to the service's background loop"""
+    st.session_state.pending_job = ollama_service.submit(stream)
+    st.session_state.pending_kind = kind
+    st.session_state.waiting_for_ai = True
+
+def complete_ai_job(kind: str, result: Dict[str, Any]):
+    """Add a finished generation to the conversation"""
+    try:
+        if kind == 'question':
+            messages = [session_flow.add_question(st.session_state.messages, result['content'])]
+        else:
+            messages, still_active = session_flow.add_turn(
+                st.session_state.messages, st.session_state.persona, st.session_state.company, result
             )
-            st.session_state.messages.append(question_msg)
-            
+            st.session_state.session_active = still_active
+            if not still_active:
+                session_store.set_active(st.session_state.session_id, False)
+    except TranscriptConflict:
+        reload_transcript()
+        ollama_service.metrics.take_session_calls(st.session_state.session_id)
+        return
+    
+    # Attach the calls made for this generation to the message that shows its result
+    calls = ollama_service.metrics.take_session_calls(st.session_state.session_id)
+    if calls:
+        st.session_state.turn_metrics[messages[0].id] = format_call_metrics(calls)
+
+@st.fragment(run_every=0.25)
+def pending_ai_reply():
+    """Show the in-progress persona reply and pick up the result once it lands"""
+    job = st.session_state.pending_job
+    if job is None:
+        return
+    
+    if job.done():
+        kind = st.session_state.pending_kind
+        try:
+            complete_ai_job(kind, job.result())
         except Exception as e:
-            st.error(f"Error generating initial question: {str(e)}")
+            action = "initial question" if kind == 'question' else "AI response"
+            st.session_state.ai_error = f"Error generating {action}: {str(e)}"
+        st.session_state.pending_job = None
+        st.session_state.pending_kind = None
+        st.session_state.waiting_for_ai = False
+        st.rerun()
+    
+    # Tokens streamed so far
+    with st.chat_message("assistant", avatar="🤖"):
+        if job.text:
+            st.write(f"**{st.session_state.persona.name}:** {job.text}▌")
+        else:
+            st.write(f"**{st.session_state.persona.name}** is thinking...")
+    st.info("⏳ Waiting for AI response...")
+
+def show_more_history():
+    st.session_state.history_pages += 1
+
+@st.fragment
+def earlier_messages(end: int):
+    """Messages before the recent window, collapsed and loaded a page at a time
+
+    Runs as a fragment so paging through history does not rerun the app.
+    """
+    start = max(0, end - st.session_state.history_pages * HISTORY_PAGE_SIZE)
+    with st.expander(f"📜 Earlier messages ({end})", expanded=start < end):
+        if start > 0:
+            st.button(
+                f"Load {min(start, HISTORY_PAGE_SIZE)} earlier messages",
+                key="load_history",
+                on_click=show_more_history
+            )
+        for message in st.session_state.messages[start:end]:
+            display_message(message)
 
 def chat_interface():
     """Display the chat interface"""
@@ -227,15 +433,20 @@ def chat_interface():
     
     # Initialize chat if empty
     if not st.session_state.messages:
-        with st.spinner("Initializing AI persona..."):
-            import asyncio
-            asyncio.run(initialize_chat_session())
-            st.rerun()
+        initialize_chat_session()
     
-    # Display messages
-    for message in st.session_state.messages:
+    # Only the latest messages are drawn on every rerun; older ones are paged in on request
+    messages = st.session_state.messages
+    recent_start = max(0, len(messages) - RECENT_MESSAGES)
+    if recent_start:
+        earlier_messages(recent_start)
+    for message in messages[recent_start:]:
         display_message(message)
     
+    if st.session_state.ai_error:
+        st.error(st.session_state.ai_error)
+        st.session_state.ai_error = None
+    
     # Input area
     if st.session_state.session_active and not st.session_state.waiting_for_ai:
         with st.form("suggestion_form", clear_on_submit=True):
@@ -247,74 +458,42 @@ def chat_interface():
             
             submitted = st.form_submit_button("Send Suggestion")
             
-            if submitted and suggestion.strip():
-                # Add user suggestion
-                suggestion_msg = Message(
-                    id=str(datetime.now().timestamp()),
-                    type='user_suggestion',
-                    content=suggestion,
-                    timestamp=datetime.now()
-                )
-                st.session_state.messages.append(suggestion_msg)
-                st.session_state.waiting_for_ai = True
-                
-                # Process AI response
-                with st.spinner("AI is thinking..."):
-                    try:
-                        import asyncio
-                        response = asyncio.run(ollama_service.generate_persona_response(
-                            st.session_state.persona,
-                            st.session_state.company,
-                            st.session_state.messages
-                        ))
-                        
-                        response_msg = Message(
-                            id=str(datetime.now().timestamp() + 1),
-                            type='persona_response',
-                            content=response['content'],
-                            timestamp=datetime.now(),
-                            status=response['status']
-                        )
-                        st.session_state.messages.append(response_msg)
-                        
-                        # Handle follow-up based on status
-                        if response['status'] == 'needs_more':
-                            # Generate follow-up question
-                            follow_up = asyncio.run(ollama_service.generate_persona_question(
-                                st.session_state.persona,
-                                st.session_state.company,
-                                st.session_state.messages
-                            ))
-                            
-                            follow_up_msg = Message(
-                                id=str(datetime.now().timestamp() + 2),
-                                type='persona_question',
-                                content=follow_up,
-                                timestamp=datetime.now()
-                            )
-                            st.session_state.messages.append(follow_up_msg)
-                            
-                        elif response['status'] == 'satisfied':
-                            # End session
-                            st.session_state.session_active = False
-                            completion_msg = Message(
-                                id=str(datetime.now().timestamp() + 3),
-                                type='system',
-                                content=f"Session completed! {st.session_state.persona.name} feels confident about using {st.session_state.company.product}. Great job providing helpful suggestions!",
-                                timestamp=datetime.now()
-                            )
-                            st.session_state.messages.append(completion_msg)
-                        
-                        st.session_state.waiting_for_ai = False
-                        
-                    except Exception as e:
-                        st.error(f"Error generating AI response: {str(e)}")
-                        st.session_state.waiting_for_ai = False
-                
+        if submitted and suggestion.strip():
+            # Add user suggestion
+            try:
+                session_flow.add_suggestion(st.session_state.messages, suggestion)
+            except TranscriptConflict:
+                reload_transcript()
                 st.rerun()
-    
+            
+            # Process AI response in the background; the follow-up question
+            # is generated while the response streams
+            start_ai_job('turn', ollama_service.stream_turn(
+                st.session_state.persona,
+                st.session_state.company,
+                st.session_state.messages,
+                session_id=st.session_state.session_id
+            ))
+            st.rerun()
+
     elif st.session_state.waiting_for_ai:
-        st.info("⏳ Waiting for AI response...")
+        pending_ai_reply()
+
+def metrics_sidebar():
+    """Toggle for per-turn metrics and the process-wide aggregates"""
+    with st.sidebar:
+        st.toggle("Show performance metrics", key="show_metrics")
+        if st.session_state.show_metrics:
+            with st.expander("📈 Service metrics"):
+                st.json(ollama_service.metrics_snapshot())
+                st.write("Startup")
+                st.json(startup.to_dict())
+                st.download_button(
+                    "Download Prometheus metrics",
+                    data=ollama_service.metrics_text(),
+                    file_name="metrics.prom",
+                    mime="text/plain"
+                )
 
 def main():
     """Main application function"""
@@ -328,6 +507,7 @@ def main():
     st.write("Create AI personas, select products, and facilitate interactive learning sessions")
     
     initialize_session_state()
+    metrics_sidebar()
     
     # Progress indicator
     steps = ['🧠 Create Persona', '🏢 Select Product', '💬 Interactive Session']
@@ -354,4 +534,5 @@ def main():
         chat_interface()
 
 if __name__ == "__main__":
-    main()
+    with startup.phase("first_render"):
+        main()
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from circuit_breaker import CircuitBreaker, CircuitOpen, CLOSED
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+class Backend:
+    """One Ollama host with its own health state and load counters"""
+
+    def __init__(self, url: str, weight: float = 1.0, breaker: Optional[CircuitBreaker] = None):
+        self.url = url.rstrip("/")
+        self.weight = weight
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.outstanding = 0
+        self.requests = 0
+
+    def load(self) -> float:
+        """Outstanding requests scaled by weight, counting the one being placed"""
+        return (self.outstanding + 1) / self.weight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "breaker": self.breaker.stats()
+        }
+
+class BackendPool:
+    """Route generations to the healthy host with the fewest outstanding requests"""
+
+    def __init__(self, backends: Sequence[Union[str, Backend]], max_sticky_sessions: int = 10000):
+        if not backends:
+            raise ValueError("At least one Ollama backend is required")
+        self.backends: List[Backend] = [b if isinstance(b, Backend) else Backend(b) for b in backends]
+        self.max_sticky_sessions = max_sticky_sessions
+        # session id -> backend, so a chat keeps hitting the host that has its model state warm
+        self._sticky: "OrderedDict[str, Backend]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "BackendPool":
+        """Build a pool from "url[=weight],url[=weight],..." """
+        backends = []
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            url, _, weight = item.partition("=")
+            backends.append(Backend(url.strip(), float(weight) if weight else 1.0))
+        return cls(backends)
+
+    def capacity(self, slots_per_backend: int) -> int:
+        """Concurrent calls the pool can serve, giving each backend slots in proportion to its weight"""
+        return max(1, round(slots_per_backend * sum(b.weight for b in self.backends)))
+
+    def available(self) -> bool:
+        """Check whether any backend might accept a call right now"""
+        # A zero probe delay means the breaker is closed or due for a trial call
+        return any(b.breaker.next_probe_delay(0) == 0 for b in self.backends)
+
+    def record_short_circuit(self):
+        """Count a call skipped because no backend was available, once on every backend's breaker"""
+        for backend in self.backends:
+            backend.breaker.record_short_circuit()
+
+    def acquire(self, session_id: Optional[str] = None) -> Backend:
+        """Pick a backend for one request and count it as outstanding"""
+        with self._lock:
+            backend = self._choose(session_id)
+            backend.outstanding += 1
+            backend.requests += 1
+            if session_id is not None:
+                self._sticky[session_id] = backend
+                self._sticky.move_to_end(session_id)
+                while len(self._sticky) > self.max_sticky_sessions:
+                    self._sticky.popitem(last=False)
+            return backend
+
+    def release(self, backend: Backend):
+        """Mark a request on a backend as finished"""
+        with self._lock:
+            backend.outstanding -= 1
+
+    def _choose(self, session_id: Optional[str]) -> Backend:
+        healthy = [b for b in self.backends if b.breaker.state == CLOSED]
+
+        sticky = self._sticky.get(session_id) if session_id is not None else None
+        if sticky is not None and sticky in healthy:
+            return sticky
+
+        if healthy:
+            return min(healthy, key=Backend.load)
+
+        # Nothing is known-good; let a recovering host take a trial call
+        for backend in sorted(self.backends, key=Backend.load):
+            if backend.breaker.allow():
+                return backend
+        raise CircuitOpen("No Ollama backend is available")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Get per-backend load and health"""
+        with self._lock:
+            return [b.stats() for b in self.backends]
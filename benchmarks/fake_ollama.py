@@ -0,0 +1,193 @@
+"""Local stand-in for the Ollama HTTP API
+
+Serves /api/generate, /api/chat, /api/embed and /api/tags with configurable latency,
+token rate, error rate and one-off model load time, and reports
+Ollama-style timing fields.
+
+    python -m benchmarks.fake_ollama --port 11434 --latency 0.2 --token-rate 40
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from semantic_cache import HashingEmbedder
+
+WORDS = (
+    "I would like to understand how this feature fits into my daily work and "
+    "what settings I should configure before I start using it with my team"
+).split()
+
+class FakeOllamaConfig:
+    """Behaviour of the stand-in server"""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        token_rate: float = 200.0,
+        tokens: int = 24,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        load_time: float = 0.0
+    ):
+        # Seconds before the first token (prompt evaluation)
+        self.latency = latency
+        # Tokens generated per second; 0 means instantly
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.error_rate = error_rate
+        # Seconds the first request waits while the model is loaded
+        self.load_time = load_time
+        self.rng = random.Random(seed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "token_rate": self.token_rate,
+            "tokens": self.tokens,
+            "error_rate": self.error_rate,
+            "load_time": self.load_time
+        }
+
+class FakeOllama:
+    """aiohttp application imitating the parts of Ollama the app uses"""
+
+    def __init__(self, config: FakeOllamaConfig):
+        self.config = config
+        self.requests = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.app = web.Application()
+        self.app.router.add_post("/api/generate", self.generate)
+        self.app.router.add_post("/api/chat", self.chat)
+        self.app.router.add_post("/api/embed", self.embed)
+        self.app.router.add_get("/api/tags", self.tags)
+
+    def _tokens(self) -> List[str]:
+        return [self.config.rng.choice(WORDS) + " " for _ in range(self.config.tokens)]
+
+    async def _load_model(self) -> float:
+        """Load the model on first use, returning the seconds this request spent waiting for it"""
+        started = time.perf_counter()
+        async with self._load_lock:
+            if not self._loaded:
+                await asyncio.sleep(self.config.load_time)
+                self._loaded = True
+        return time.perf_counter() - started
+
+    def _timings(self, prompt_chars: int, started: float, eval_seconds: float, load_seconds: float) -> Dict[str, Any]:
+        ns = 1_000_000_000
+        return {
+            "total_duration": int((time.perf_counter() - started) * ns),
+            "load_duration": int(load_seconds * ns),
+            "prompt_eval_count": max(1, prompt_chars // 4),
+            "prompt_eval_duration": int(self.config.latency * ns),
+            "eval_count": self.config.tokens,
+            "eval_duration": int(eval_seconds * ns)
+        }
+
+    async def _reply(self, request: web.Request, prompt_chars: int, stream: bool, chat: bool) -> web.StreamResponse:
+        self.requests += 1
+        started = time.perf_counter()
+        if self.config.rng.random() < self.config.error_rate:
+            return web.json_response({"error": "simulated failure"}, status=500)
+
+        load_seconds = await self._load_model()
+        await asyncio.sleep(self.config.latency)
+        tokens = self._tokens()
+        delay = 1.0 / self.config.token_rate if self.config.token_rate else 0.0
+
+        def chunk(text: str, done: bool) -> Dict[str, Any]:
+            body: Dict[str, Any] = {"model": "fake", "done": done}
+            if chat:
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+            return body
+
+        if not stream:
+            await asyncio.sleep(delay * len(tokens))
+            body = chunk("".join(tokens), True)
+            body.update(self._timings(prompt_chars, started, delay * len(tokens), load_seconds))
+            if not chat:
+                body["context"] = list(range(prompt_chars // 4))
+            return web.json_response(body)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        eval_started = time.perf_counter()
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            await response.write((json.dumps(chunk(token, False)) + "\n").encode())
+        final = chunk("", True)
+        final.update(self._timings(prompt_chars, started, time.perf_counter() - eval_started, load_seconds))
+        await response.write((json.dumps(final) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        if not payload.get("prompt"):
+            # Like Ollama, a request without a prompt only loads the model
+            self.requests += 1
+            started = time.perf_counter()
+            load_seconds = await self._load_model()
+            return web.json_response({
+                "model": "fake",
+                "response": "",
+                "done": True,
+                "done_reason": "load",
+                "total_duration": int((time.perf_counter() - started) * 1_000_000_000),
+                "load_duration": int(load_seconds * 1_000_000_000)
+            })
+        prompt_chars = len(payload.get("prompt", "")) + len(payload.get("system", ""))
+        return await self._reply(request, prompt_chars, payload.get("stream", True), chat=False)
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+        return await self._reply(request, prompt_chars, payload.get("stream", True), chat=True)
+
+    async def embed(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        texts = payload.get("input", "")
+        if isinstance(texts, str):
+            texts = [texts]
+        # Surface-similarity vectors stand in for a real embedding model
+        return web.json_response({"model": payload.get("model", "fake"), "embeddings": HashingEmbedder().embed(texts).tolist()})
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": "qwen2.5:0.5b"}]})
+
+async def start_fake_ollama(config: FakeOllamaConfig, port: int = 0) -> Tuple[web.AppRunner, str]:
+    """Start a stand-in server on the running loop and return its runner and base URL"""
+    server = FakeOllama(config)
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{bound_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second (0 = instant)")
+    parser.add_argument("--tokens", type=int, default=24, help="Tokens per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 500")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--load-time", type=float, default=0.0, help="Seconds to load the model on the first request")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(args.latency, args.token_rate, args.tokens, args.error_rate, args.seed, args.load_time)
+    web.run_app(FakeOllama(config).app, host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Benchmarks for the OllamaService hot paths against a local stand-in server
+
+    python -m benchmarks.run_benchmarks --iterations 200 --concurrency 16 --output bench_results.json
+    python -m benchmarks.run_benchmarks --compare bench_results.json
+
+Every run writes a JSON report; --compare checks the new p50s against an
+earlier report and exits non-zero when any benchmark regressed.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+from admission import AdmissionRejected
+from benchmarks.fake_ollama import FakeOllamaConfig, start_fake_ollama
+from circuit_breaker import CircuitOpen
+from generation_cache import GenerationCache
+from models import MessageType
+from ollama_service import OllamaService
+from semantic_cache import HashingEmbedder, SemanticCache
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from simulator import summarize
+from transcript import Transcript
+
+PERSONA = SAMPLE_PERSONAS[0]
+COMPANY = SAMPLE_COMPANIES[0]
+
+async def bench_async(
+    name: str,
+    call: Callable[[int], Awaitable[Any]],
+    iterations: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Time an async call, running up to `concurrency` at once
+
+    Calls shed by the scheduler or an open circuit never reach the model;
+    they are counted separately rather than timed.
+    """
+    samples: List[float] = []
+    shed = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal shed
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except (AdmissionRejected, CircuitOpen):
+                shed += 1
+                return
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    duration = time.perf_counter() - start
+    return {"name": name, "concurrency": concurrency, "ops_per_s": iterations / duration, "shed": shed, **summarize(samples)}
+
+def bench_sync(name: str, call: Callable[[int], Any], iterations: int) -> Dict[str, Any]:
+    """Time a synchronous call"""
+    samples: List[float] = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - call_start)
+    duration = time.perf_counter() - start
+    return {"name": name, "concurrency": 1, "ops_per_s": iterations / duration, **summarize(samples)}
+
+def suggestion_history(i: int) -> Transcript:
+    """History ending in a unique suggestion, so concurrent calls are not coalesced"""
+    history = Transcript()
+    history.add(MessageType.PERSONA_QUESTION, "How do I get started?")
+    history.add(
+        MessageType.USER_SUGGESTION,
+        f"Open {COMPANY.product}, go to settings and configure your workspace step by step (run {i})."
+    )
+    return history
+
+async def run_benchmarks(service: OllamaService, iterations: int, concurrency: int) -> List[Dict[str, Any]]:
+    """Run every benchmark at concurrency 1 and at the requested concurrency"""
+
+    async def call_ollama(i: int):
+        await service.call_ollama(f"Benchmark prompt {i}", "You are a benchmark persona.", use_cache=False)
+
+    async def stream_ollama(i: int):
+        async for _ in service.stream_ollama(f"Benchmark prompt {i}", "You are a benchmark persona.", use_cache=False):
+            pass
+
+    async def generate_persona_question(i: int):
+        persona = dataclasses.replace(PERSONA, name=f"{PERSONA.name} {i}")
+        await service.generate_persona_question(persona, COMPANY, [])
+
+    async def generate_persona_response(i: int):
+        await service.generate_persona_response(PERSONA, COMPANY, suggestion_history(i))
+
+    async def generate_turn(i: int):
+        await service.generate_turn(PERSONA, COMPANY, suggestion_history(i), session_id=f"bench-{i}")
+        service.chat_sessions.discard(f"bench-{i}")
+
+    async_benchmarks = [
+        ("call_ollama", call_ollama),
+        ("stream_ollama", stream_ollama),
+        ("generate_persona_question", generate_persona_question),
+        ("generate_persona_response", generate_persona_response),
+        ("generate_turn", generate_turn)
+    ]
+
+    results = []
+    for name, call in async_benchmarks:
+        for level in sorted({1, concurrency}):
+            results.append(await bench_async(name, call, iterations, level))
+
+    # Template fallbacks and semantic lookups are CPU-only; run many more iterations
+    template_iterations = iterations * 100
+    results.append(bench_sync(
+        "_get_template_question",
+        lambda i: service._get_template_question(PERSONA, COMPANY, i % 5),
+        template_iterations
+    ))
+    results.append(bench_sync(
+        "_get_template_response",
+        lambda i: service._get_template_response(PERSONA, COMPANY, ('satisfied', 'needs_more', 'unclear')[i % 3]),
+        template_iterations
+    ))
+
+    # Lookups in a full scope of near-misses, so every row is compared
+    semantic_cache = SemanticCache(max_entries_per_scope=256)
+    embedder = HashingEmbedder()
+    for i in range(semantic_cache.max_entries_per_scope):
+        semantic_cache.add("bench", embedder.embed([f"Question {i}", f"Suggestion number {i} about {COMPANY.product}"]), "reply")
+    lookups = [embedder.embed(["Question", f"Another suggestion {i}"]) for i in range(16)]
+    results.append(bench_sync("semantic_cache.get", lambda i: semantic_cache.get("bench", lookups[i % 16]), template_iterations))
+
+    # Offline re-scoring of archived suggestions, 1000 per batch
+    suggestions = [suggestion_history(i).last_suggestion.content for i in range(1000)]
+    results.append(bench_sync(
+        "SuggestionScorer.score_batch[1000]",
+        lambda i: service.scorer.score_batch(suggestions, COMPANY.product, seed=i),
+        iterations
+    ))
+    return results
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def compare(results: List[Dict[str, Any]], baseline_report: Dict[str, Any], threshold: float) -> List[str]:
+    """List benchmarks whose p50 is more than `threshold` slower than the baseline"""
+    baseline = {(r["name"], r["concurrency"]): r for r in baseline_report["results"]}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result["name"], result["concurrency"]))
+        if not before or not before["p50"]:
+            continue
+        change = result["p50"] / before["p50"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{result['name']} (concurrency {result['concurrency']}): "
+                f"p50 {before['p50'] * 1000:.3f}ms -> {result['p50'] * 1000:.3f}ms (+{change:.0%})"
+            )
+    return regressions
+
+async def bench_first_question(config: FakeOllamaConfig, warm_up: bool, repeats: int = 3) -> Dict[str, Any]:
+    """Time the first opening question against a freshly started server, with or without warming up first"""
+    samples: List[float] = []
+    for _ in range(repeats):
+        runner, url = await start_fake_ollama(config)
+        service = OllamaService(
+            backends=[url],
+            cache=GenerationCache(max_entries=0),
+            semantic_cache=SemanticCache(max_entries_per_scope=0),
+            health_check_interval=0
+        )
+        try:
+            if warm_up:
+                await service.warm_up()
+            start = time.perf_counter()
+            await service.generate_persona_question(PERSONA, COMPANY, [])
+            samples.append(time.perf_counter() - start)
+        finally:
+            service.close()
+            await runner.cleanup()
+    name = "first_question_warm" if warm_up else "first_question_cold"
+    return {"name": name, "concurrency": 1, "ops_per_s": len(samples) / sum(samples), **summarize(samples)}
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    config = FakeOllamaConfig(args.latency, args.token_rate, args.tokens, args.error_rate, seed=0, load_time=args.load_time)
+    runner, url = await start_fake_ollama(config)
+    # The caches would turn repeat calls into lookups; measure the real path
+    service = OllamaService(
+        backends=[url],
+        cache=GenerationCache(max_entries=0),
+        semantic_cache=SemanticCache(max_entries_per_scope=0),
+        health_check_interval=0
+    )
+    try:
+        # The model loads on the first request; warm it before timing the steady state
+        await service.warm_up()
+        results = await run_benchmarks(service, args.iterations, args.concurrency)
+    finally:
+        service.close()
+        await runner.cleanup()
+
+    # Cold start, each run against a server that has not loaded the model yet
+    for warm_up in (False, True):
+        results.append(await bench_first_question(config, warm_up))
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "server": config.to_dict(),
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OllamaService against a local stand-in server")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stand-in seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Stand-in tokens per second (0 = instant)")
+    parser.add_argument("--tokens", type=int, default=24)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--load-time", type=float, default=0.5, help="Stand-in seconds to load the model on first use")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    # Read the baseline first, in case it is the file about to be overwritten
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = asyncio.run(main_async(args))
+
+    for r in report["results"]:
+        print(
+            f"{r['name']:>28} c={r['concurrency']:<3} p50 {r['p50'] * 1000:9.3f}ms  "
+            f"p95 {r['p95'] * 1000:9.3f}ms  p99 {r['p99'] * 1000:9.3f}ms  {r['ops_per_s']:10.1f} ops/s"
+            + (f"  {r['shed']} shed" if r.get("shed") else "")
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(report["results"], baseline, args.threshold)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Rough tokens per character for budgeting; avoids running a tokenizer per turn
+CHARS_PER_TOKEN = 4
+# Role and framing overhead Ollama adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a message"""
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+class ChatExchange:
+    """A prompt whose reply is still being generated, holding its place in the history"""
+
+    def __init__(self, session: "ChatSession", prompt: str):
+        self.session = session
+        self.prompt = prompt
+        self.reply: Optional[str] = None
+
+    def finish(self, reply: str):
+        """Fill in the reply, making the exchange part of later requests"""
+        self.reply = reply
+        self.session.history_tokens += estimate_tokens(self.prompt) + estimate_tokens(reply)
+
+    def abandon(self):
+        """Drop an exchange that produced no reply"""
+        if self.reply is None and self in self.session.exchanges:
+            self.session.exchanges.remove(self)
+
+class ChatSession:
+    """Message history sent to /api/chat for one training session
+
+    The system prompt stays fixed for the whole session and turns are only
+    ever appended, so Ollama can reuse the already-evaluated prompt prefix.
+    Exchanges take their place when the request starts, not when the reply
+    lands, so concurrent calls (a response and its follow-up question) keep
+    the conversation's order whatever their timing.
+    Once the history passes its token budget the oldest exchanges are taken
+    out, down to half the budget, and folded into a rolling summary; this
+    happens every few turns rather than every turn, so the prefix stays
+    reusable in between and prompt size stays bounded.
+    """
+
+    def __init__(self, system_prompt: str, max_history_tokens: int = 2048):
+        self.system_prompt = system_prompt
+        self.max_history_tokens = max_history_tokens
+        self.exchanges: List[ChatExchange] = []
+        self.summary = ""
+        self.history_tokens = 0
+        # Set while older exchanges are being summarized
+        self.summarizing = False
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """Completed exchanges as /api/chat messages"""
+        messages = []
+        for exchange in self.exchanges:
+            if exchange.reply is not None:
+                messages.append({"role": "user", "content": exchange.prompt})
+                messages.append({"role": "assistant", "content": exchange.reply})
+        return messages
+
+    def request_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Build the message list for a new user prompt"""
+        system_prompt = self.system_prompt
+        if self.summary:
+            system_prompt += f"\nSummary of the conversation so far: {self.summary}"
+        return (
+            [{"role": "system", "content": system_prompt}]
+            + self.messages
+            + [{"role": "user", "content": prompt}]
+        )
+
+    def start(self, prompt: str) -> ChatExchange:
+        """Reserve the next place in the history for a prompt being sent"""
+        exchange = ChatExchange(self, prompt)
+        self.exchanges.append(exchange)
+        return exchange
+
+    def take_overflow(self) -> List[Dict[str, str]]:
+        """Remove the oldest completed exchanges once the history is over budget
+
+        Returns the removed messages for summarizing, or an empty list when
+        within budget or a summary is already being written.
+        """
+        if self.summarizing or self.history_tokens <= self.max_history_tokens:
+            return []
+
+        target = self.max_history_tokens // 2
+        overflow = []
+        while self.exchanges and self.exchanges[0].reply is not None and self.history_tokens > target:
+            exchange = self.exchanges.pop(0)
+            self.history_tokens -= estimate_tokens(exchange.prompt) + estimate_tokens(exchange.reply)
+            overflow.append({"role": "user", "content": exchange.prompt})
+            overflow.append({"role": "assistant", "content": exchange.reply})
+
+        if overflow:
+            self.summarizing = True
+        return overflow
+
+    def add_summary(self, summary: str):
+        """Replace the rolling summary once the overflow has been summarized"""
+        self.summary = summary.strip()
+        self.summarizing = False
+
+    def extractive_summary(self, overflow: List[Dict[str, str]], max_chars: int = 600) -> str:
+        """Summary without the model: the previous summary plus the first sentence of each reply"""
+        sentences = [self.summary] if self.summary else []
+        for message in overflow:
+            if message["role"] == "assistant" and message["content"].strip():
+                sentences.append(message["content"].strip().split(". ")[0].rstrip(".") + ".")
+        summary = " ".join(sentences)
+        # Keep the most recent part when it runs long
+        return summary[-max_chars:]
+
+class ChatSessionStore:
+    """Bounded LRU of chat sessions keyed by session id"""
+
+    def __init__(self, max_sessions: int = 10000, max_history_tokens: int = 2048):
+        self.max_sessions = max_sessions
+        self.max_history_tokens = max_history_tokens
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, system_prompt: str) -> ChatSession:
+        """Get the session's history, starting over if its system prompt changed"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.system_prompt != system_prompt:
+                session = ChatSession(system_prompt, self.max_history_tokens)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def discard(self, session_id: str):
+        """Forget a session's history"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
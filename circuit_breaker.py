@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpen(Exception):
+    """Raised when a model call is skipped because the backend is known to be down"""
+
+class CircuitBreaker:
+    """Trip after consecutive failures and retry with exponential backoff"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 2.0, max_reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._backoff = reset_timeout
+        self._opened_at = 0.0
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+        self.trips = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        """Check whether a call may go to the backend"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self._backoff:
+                # Let a single trial call through
+                self.state = HALF_OPEN
+                self._trial_started_at = now
+                return True
+            if self.state == HALF_OPEN and now - self._trial_started_at >= self._backoff:
+                # The previous trial never reported back; allow another
+                self._trial_started_at = now
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def record_short_circuit(self):
+        """Count a call skipped without asking this breaker, e.g. because no backend was available"""
+        with self._lock:
+            self.short_circuited += 1
+
+    def record_success(self):
+        """Close the circuit after a successful call or probe"""
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._backoff = self.reset_timeout
+
+    def record_failure(self):
+        """Count a failure, opening the circuit or backing off further"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == CLOSED:
+                if self.consecutive_failures >= self.failure_threshold:
+                    self._open()
+            else:
+                # Failed trial: stay open and wait longer before the next one
+                self._backoff = min(self._backoff * 2, self.max_reset_timeout)
+                self._open()
+
+    def _open(self):
+        if self.state == CLOSED:
+            self.trips += 1
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    def next_probe_delay(self, interval: float) -> float:
+        """Seconds until the health probe should run again"""
+        with self._lock:
+            if self.state == CLOSED:
+                return interval
+            since = self._opened_at if self.state == OPEN else self._trial_started_at
+            return max(0.0, self._backoff - (time.monotonic() - since))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "backoff": self._backoff
+            }
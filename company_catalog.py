@@ -0,0 +1,127 @@
+import csv
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from models import Company
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class CompanyCatalog:
+    """Searchable company catalog with a trigram index and a category index
+
+    Search keeps the selector's semantics (case-insensitive substring match on
+    name, product or description), but candidates come from intersecting
+    trigram posting lists, so a query only touches companies that can match.
+    Everything is lowercased and indexed once, when the catalog is built.
+    """
+
+    # Rank weights for where the query matched
+    NAME_WEIGHT = 4
+    PRODUCT_WEIGHT = 3
+    DESCRIPTION_WEIGHT = 1
+
+    def __init__(self, companies: Iterable[Company]):
+        self.companies: List[Company] = list(companies)
+        self._names = [c.name.lower() for c in self.companies]
+        self._products = [c.product.lower() for c in self.companies]
+        self._descriptions = [c.description.lower() for c in self.companies]
+
+        # trigram -> ascending company indexes
+        self._postings: Dict[str, array] = {}
+        for index in range(len(self.companies)):
+            text = f"{self._names[index]}\n{self._products[index]}\n{self._descriptions[index]}"
+            for trigram in _trigrams(text):
+                postings = self._postings.get(trigram)
+                if postings is None:
+                    postings = self._postings[trigram] = array('I')
+                postings.append(index)
+
+        # category -> ascending company indexes
+        self._by_category: Dict[str, array] = {}
+        for index, company in enumerate(self.companies):
+            self._by_category.setdefault(company.category, array('I')).append(index)
+        self.categories: List[str] = sorted(self._by_category)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompanyCatalog":
+        """Load a catalog from a JSON list or a CSV file with id, name, product, description and category"""
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                rows = list(csv.DictReader(f))
+            else:
+                rows = json.load(f)
+        return cls(
+            Company(
+                id=str(row["id"]),
+                name=row["name"],
+                product=row["product"],
+                description=row.get("description", ""),
+                category=row.get("category", "")
+            )
+            for row in rows
+        )
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def _candidates(self, query: str) -> Optional[Sequence[int]]:
+        """Indexes that contain every trigram of the query, or None when the query is too short to use the index"""
+        trigrams = _trigrams(query)
+        if not trigrams:
+            return None
+        postings = []
+        for trigram in trigrams:
+            found = self._postings.get(trigram)
+            if found is None:
+                return []
+            postings.append(found)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates.intersection_update(other)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def _score(self, index: int, query: str) -> int:
+        """Rank of a match; 0 if the query is not a substring of any field"""
+        score = 0
+        for text, weight in (
+            (self._names[index], self.NAME_WEIGHT),
+            (self._products[index], self.PRODUCT_WEIGHT),
+            (self._descriptions[index], self.DESCRIPTION_WEIGHT)
+        ):
+            position = text.find(query)
+            if position < 0:
+                continue
+            score += weight
+            # Exact and prefix matches rank above matches mid-word
+            if text == query:
+                score += 2 * weight
+            elif position == 0:
+                score += weight
+        return score
+
+    def search(self, query: str = "", category: Optional[str] = None) -> List[Company]:
+        """Companies matching the query (best first) and category; all of them for an empty query"""
+        query = query.strip().lower()
+        scope = self._by_category.get(category, array('I')) if category is not None else None
+
+        if not query:
+            indexes = scope if scope is not None else range(len(self.companies))
+            return [self.companies[index] for index in indexes]
+
+        candidates = self._candidates(query)
+        if candidates is None:
+            candidates = scope if scope is not None else range(len(self.companies))
+        elif category is not None:
+            candidates = [index for index in candidates if self.companies[index].category == category]
+
+        scored = []
+        for index in candidates:
+            score = self._score(index, query)
+            if score:
+                scored.append((-score, index))
+        scored.sort()
+        return [self.companies[index] for _, index in scored]
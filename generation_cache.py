@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+class GenerationCache:
+    """LRU + TTL cache of model generations, optionally persisted to SQLite"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+
+        # key -> (created_at, value), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Drop anything that expired while the app was down
+            self._db.execute("DELETE FROM generations WHERE created_at < ?", (time.time() - ttl_seconds,))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """Build a stable cache key for a generation request"""
+        raw = json.dumps([model, system_prompt, prompt, options or {}], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return time.time() - created_at < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached generation, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_fresh(entry[0]):
+                del self._entries[key]
+                entry = None
+
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT created_at, value FROM generations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._is_fresh(row[0]):
+                    entry = (row[0], row[1])
+                    self._store(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        """Cache a generation"""
+        if self.max_entries <= 0:
+            return
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO generations (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, entry[0])
+                )
+                self._db.commit()
+
+    def _store(self, key: str, entry: Tuple[float, str]):
+        """Insert into the in-memory LRU, evicting the least recently used entries"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every cached generation"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM generations")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries
+            }
+
+    def close(self):
+        """Close the SQLite backend, if any"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,24 @@
+import concurrent.futures
+from typing import Any, Dict, Optional
+
+class GenerationJob:
+    """Handle for a persona generation running on the service's I/O loop
+
+    The UI thread polls it: ``text`` holds the tokens streamed so far and
+    ``result()`` returns the final chunk once ``done()``.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.future: Optional[concurrent.futures.Future] = None
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self) -> Dict[str, Any]:
+        """Get the final chunk, raising the job's error if it failed"""
+        return self.future.result(timeout=0)
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
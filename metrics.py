@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+NS_PER_SECOND = 1_000_000_000
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Timings that get a histogram
+TIMED_FIELDS = ("total_s", "queue_s", "network_s", "load_s", "prompt_eval_s", "eval_s", "first_token_s")
+
+@dataclass
+class CallMetrics:
+    """Timing and token counts for one call_ollama / stream_ollama call"""
+    endpoint: str
+    stream: bool
+    outcome: str  # 'model', 'cache', 'semantic', 'fallback', 'shed'
+    total_s: float
+    session_id: Optional[str] = None
+    queue_s: float = 0.0
+    network_s: float = 0.0
+    load_s: float = 0.0
+    prompt_eval_s: float = 0.0
+    eval_s: float = 0.0
+    first_token_s: Optional[float] = None
+    prompt_tokens: int = 0
+    eval_tokens: int = 0
+    error: Optional[str] = None
+
+    @property
+    def tokens_per_s(self) -> float:
+        return self.eval_tokens / self.eval_s if self.eval_s else 0.0
+
+    def apply_reply(self, reply: Dict[str, Any]):
+        """Fill in Ollama's timing fields (nanoseconds) and the service's queue/network timings"""
+        self.queue_s = reply.get("queue_duration", 0) / NS_PER_SECOND
+        self.network_s = reply.get("network_duration", 0) / NS_PER_SECOND
+        self.load_s = reply.get("load_duration", 0) / NS_PER_SECOND
+        self.prompt_eval_s = reply.get("prompt_eval_duration", 0) / NS_PER_SECOND
+        self.eval_s = reply.get("eval_duration", 0) / NS_PER_SECOND
+        self.prompt_tokens = reply.get("prompt_eval_count", 0)
+        self.eval_tokens = reply.get("eval_count", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["tokens_per_s"] = self.tokens_per_s
+        return data
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+class MetricsRegistry:
+    """In-process aggregate of per-call metrics with JSON and Prometheus text dumps"""
+
+    def __init__(self, recent_per_session: int = 20, max_sessions: int = 10000):
+        self.recent_per_session = recent_per_session
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        # (endpoint, outcome) -> calls
+        self._calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._histograms: Dict[str, _Histogram] = {field: _Histogram() for field in TIMED_FIELDS}
+        self._prompt_tokens = 0
+        self._eval_tokens = 0
+        self._eval_seconds = 0.0
+        # session id -> calls not yet collected by the UI
+        self._recent: "OrderedDict[str, Deque[CallMetrics]]" = OrderedDict()
+
+    def record(self, call: CallMetrics):
+        """Add one call's metrics"""
+        with self._lock:
+            self._calls[(call.endpoint, call.outcome)] += 1
+            for field in TIMED_FIELDS:
+                value = getattr(call, field)
+                if value is not None and (field == "total_s" or call.outcome == 'model'):
+                    self._histograms[field].observe(value)
+            self._prompt_tokens += call.prompt_tokens
+            self._eval_tokens += call.eval_tokens
+            self._eval_seconds += call.eval_s
+
+            if call.session_id is not None:
+                recent = self._recent.get(call.session_id)
+                if recent is None:
+                    recent = self._recent[call.session_id] = deque(maxlen=self.recent_per_session)
+                recent.append(call)
+                self._recent.move_to_end(call.session_id)
+                while len(self._recent) > self.max_sessions:
+                    self._recent.popitem(last=False)
+
+    def take_session_calls(self, session_id: str) -> List[CallMetrics]:
+        """Collect (and clear) the calls recorded for a session since the last collection"""
+        with self._lock:
+            recent = self._recent.pop(session_id, None)
+            return list(recent) if recent else []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aggregates as a JSON-serializable dict"""
+        with self._lock:
+            calls: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (endpoint, outcome), count in self._calls.items():
+                calls[endpoint][outcome] = count
+            return {
+                "calls": dict(calls),
+                "timings": {
+                    field: {
+                        "count": histogram.count,
+                        "mean": histogram.sum / histogram.count if histogram.count else 0.0
+                    }
+                    for field, histogram in self._histograms.items()
+                },
+                "prompt_tokens": self._prompt_tokens,
+                "eval_tokens": self._eval_tokens,
+                "tokens_per_s": self._eval_tokens / self._eval_seconds if self._eval_seconds else 0.0
+            }
+
+    def to_prometheus(
+        self,
+        counters: Optional[Dict[str, float]] = None,
+        gauges: Optional[Dict[str, float]] = None
+    ) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        lines = ["# TYPE ollama_calls_total counter"]
+        with self._lock:
+            for (endpoint, outcome), count in sorted(self._calls.items()):
+                lines.append(f'ollama_calls_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+
+            for field, histogram in self._histograms.items():
+                name = f"ollama_call_{field[:-2]}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum {histogram.sum}")
+                lines.append(f"{name}_count {histogram.count}")
+
+            lines.append("# TYPE ollama_prompt_tokens_total counter")
+            lines.append(f"ollama_prompt_tokens_total {self._prompt_tokens}")
+            lines.append("# TYPE ollama_eval_tokens_total counter")
+            lines.append(f"ollama_eval_tokens_total {self._eval_tokens}")
+
+        for name, value in sorted((counters or {}).items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+class StartupTimings:
+    """How long each one-off startup phase took, recorded once per process"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.warm_up: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block the first time it runs; later runs (e.g. Streamlit reruns) are not recorded"""
+        if name in self.phases:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        self.phases[name] = time.perf_counter() - start
+
+    def record(self, name: str, seconds: float):
+        """Record a phase timed elsewhere, unless it was already recorded"""
+        self.phases.setdefault(name, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"phases": dict(self.phases), "warm_up": self.warm_up}
@@ -1,7 +1,7 @@
-
 from dataclasses import dataclass
-from typing import List, Optional
 from datetime import datetime
+from enum import Enum
+from typing import List, Optional
 
 @dataclass
 class Persona:
@@ -19,10 +19,44 @@ class Company:
     description: str
     category: str
 
-@dataclass
+class MessageType(str, Enum):
+    """Kind of chat message; compares equal to its string value"""
+    SYSTEM = 'system'
+    PERSONA_QUESTION = 'persona_question'
+    USER_SUGGESTION = 'user_suggestion'
+    PERSONA_RESPONSE = 'persona_response'
+
+class ResponseStatus(str, Enum):
+    """How the persona rated a suggestion; compares equal to its string value"""
+    SATISFIED = 'satisfied'
+    NEEDS_MORE = 'needs_more'
+    UNCLEAR = 'unclear'
+
+@dataclass(frozen=True)
 class Message:
-    id: str
-    type: str  # 'persona_question', 'user_suggestion', 'persona_response', 'system'
+    """One chat message, created by a Transcript
+
+    Slotted and immutable, since every session keeps its transcript in
+    memory. Ids count up from 1 within a transcript, and ``created`` is a
+    Unix timestamp.
+    """
+    # Declared by hand rather than with slots=True to keep Python 3.8 support
+    __slots__ = ('id', 'type', 'content', 'status', 'created')
+
+    id: int
+    type: MessageType
     content: str
-    timestamp: datetime
-    status: Optional[str] = None  # 'satisfied', 'needs_more', 'unclear'
+    status: Optional[ResponseStatus]
+    created: float
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.created)
+
+    # Frozen slotted classes need explicit pickle support before Python 3.10
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
@@ -1,14 +1,133 @@
 
 import asyncio
+import concurrent.futures
 import json
 import random
-from typing import List, Dict, Any
-from models import Persona, Company, Message
+import threading
+import time
+from typing import List, Dict, Any, Optional, Awaitable, AsyncIterator, Callable, Sequence, Set, Tuple, TypeVar, Union
+
+import numpy as np
+
+from models import Persona, Company, Message, MessageType
+from generation_cache import GenerationCache
+from single_flight import SingleFlight
+from admission import AdmissionScheduler, AdmissionRejected, PRIORITY_TURN, PRIORITY_OPENING, PRIORITY_BACKGROUND
+from circuit_breaker import CircuitOpen
+from backend_pool import Backend, BackendPool, DEFAULT_OLLAMA_URL
+from chat_sessions import ChatExchange, ChatSession, ChatSessionStore
+from generation_jobs import GenerationJob
+from metrics import CallMetrics, MetricsRegistry, NS_PER_SECOND
+from transcript import Transcript, MessageHistory
+from transports import HttpTransport
+from semantic_cache import HashingEmbedder, SemanticCache
+from suggestion_scorer import SuggestionScorer
+
+T = TypeVar("T")
+
+# Sentinel marking the end of a stream bridged from the I/O loop
+_END_OF_STREAM = object()
+
+# Errors meaning the model was deliberately not called; callers go straight to templates
+_SHED_ERRORS = (AdmissionRejected, CircuitOpen)
+
+# Persona reply when the history has no suggestion to respond to
+_NO_SUGGESTION_REPLY = "I didn't receive any suggestion. Could you please provide some guidance?"
 
 class OllamaService:
-    def __init__(self, model_name: str = "qwen2.5:0.5b"):
+    def __init__(
+        self,
+        model_name: str = "qwen2.5:0.5b",
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        total_timeout: float = 120.0,
+        max_connections_per_host: int = 16,
+        keepalive_timeout: float = 60.0,
+        cache: Optional[GenerationCache] = None,
+        scheduler: Optional[AdmissionScheduler] = None,
+        backends: Optional[Union[BackendPool, Sequence[Union[str, Backend]]]] = None,
+        slots_per_backend: int = 4,
+        health_check_interval: float = 15.0,
+        keep_alive: Optional[Union[str, int]] = "30m",
+        options: Optional[Dict[str, Any]] = None,
+        max_chat_sessions: int = 10000,
+        max_history_tokens: int = 2048,
+        transport: Optional[Any] = None,
+        seed: Optional[int] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        embedding_model: Optional[str] = None,
+        scorer: Optional[SuggestionScorer] = None
+    ):
         self.model_name = model_name
-        self.base_url = "http://localhost:11434"
+        
+        # Sent with every request: keep_alive stops Ollama unloading the model
+        # between turns, and fixed options avoid reloads caused by changed settings
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        
+        # Per-session /api/chat histories, so prompt evaluation is incremental;
+        # older turns are summarized once a history passes max_history_tokens
+        self.chat_sessions = ChatSessionStore(max_chat_sessions, max_history_tokens)
+        
+        # Per-call latency and token metrics
+        self.metrics = MetricsRegistry()
+        
+        # Ollama hosts; each generation goes to the least-loaded healthy one
+        if isinstance(backends, BackendPool):
+            self.backends = backends
+        else:
+            self.backends = BackendPool(backends or [DEFAULT_OLLAMA_URL])
+        
+        # HTTP pool settings
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        
+        # How requests reach Ollama: pooled HTTP by default, or a recording or
+        # replaying transport for offline regression runs. The HTTP session lives
+        # on a service-owned I/O loop so pooled connections outlive the short
+        # asyncio.run() loops of Streamlit reruns
+        self.transport = transport if transport is not None else HttpTransport(
+            connect_timeout, read_timeout, total_timeout, max_connections_per_host, keepalive_timeout
+        )
+        
+        # Source of the status draws and template picks; seed it for repeatable runs
+        self.random = random.Random(seed)
+        
+        # Rubric for rating suggestions, shared with offline re-scoring
+        self.scorer = scorer if scorer is not None else SuggestionScorer()
+        self._io_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._io_thread: Optional[threading.Thread] = None
+        self._io_lock = threading.Lock()
+        
+        # Cache of successful generations, in memory unless given a persistent one
+        self.cache = cache if cache is not None else GenerationCache()
+        
+        # Responses reused for near-duplicate suggestions to similar questions.
+        # Keys come from Ollama's /api/embed when an embedding model is named,
+        # otherwise from a local hashing embedder that only catches close rewordings
+        self.semantic_cache = semantic_cache if semantic_cache is not None else SemanticCache()
+        self.embedding_model = embedding_model
+        self.embedder = HashingEmbedder()
+        
+        # Identical concurrent requests from different sessions share one call
+        self._single_flight = SingleFlight()
+        
+        # Caps concurrent model calls service-wide and sheds load past the queue deadline;
+        # the cap grows with the pool so each added host adds throughput
+        self.scheduler = scheduler if scheduler is not None else AdmissionScheduler(
+            max_concurrent=self.backends.capacity(slots_per_backend)
+        )
+        
+        # Each backend's circuit breaker trips on consecutive failures so outages
+        # skip the network entirely; background probes of /api/tags close it again
+        self.health_check_interval = health_check_interval
+        self._health_probes = []
+        
+        # History summaries running on the I/O loop, cancelled on close
+        self._summaries: Set[concurrent.futures.Future] = set()
         
         # Question templates for different stages
         self.question_templates = [
@@ -49,46 +168,519 @@ class OllamaService:
             ]
         }
 
-    async def call_ollama(self, prompt: str, system_prompt: str = "") -> str:
-        """Call Ollama API with the given prompt"""
+    def _get_io_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the service's I/O loop thread on first use"""
+        with self._io_lock:
+            if self._io_loop is None or self._io_loop.is_closed():
+                self._io_loop = asyncio.new_event_loop()
+                self._io_thread = threading.Thread(
+                    target=self._io_loop.run_forever,
+                    name="ollama-io",
+                    daemon=True
+                )
+                self._io_thread.start()
+                if self.health_check_interval:
+                    self._health_probes = [
+                        asyncio.run_coroutine_threadsafe(self._probe_health(backend), self._io_loop)
+                        for backend in self.backends.backends
+                    ]
+            return self._io_loop
+
+    async def _run_on_io_loop(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine on the I/O loop and await it from the caller's loop"""
+        loop = self._get_io_loop()
+        try:
+            if asyncio.get_running_loop() is loop:
+                return await coro
+        except RuntimeError:
+            pass
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+        """POST a payload to an API endpoint on the chosen backend"""
+        backend = self.backends.acquire(session_id)
+        try:
+            result = await self.transport.post(f"{backend.url}{endpoint}", payload)
+        except Exception:
+            backend.breaker.record_failure()
+            raise
+        finally:
+            self.backends.release(backend)
+        backend.breaker.record_success()
+        return result
+
+    async def _stream(self, endpoint: str, payload: Dict[str, Any], session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """POST a streaming payload to an API endpoint on the chosen backend and yield its chunks"""
+        backend = self.backends.acquire(session_id)
+        try:
+            async for chunk in self.transport.stream(f"{backend.url}{endpoint}", payload):
+                if chunk.get("done"):
+                    backend.breaker.record_success()
+                yield chunk
+        except Exception:
+            backend.breaker.record_failure()
+            raise
+        finally:
+            self.backends.release(backend)
+
+    async def _check_health(self, backend: Backend) -> bool:
+        """Probe a backend's /api/tags and report the result to its circuit breaker"""
+        healthy = await self.transport.healthy(f"{backend.url}/api/tags")
+        if healthy:
+            backend.breaker.record_success()
+        else:
+            backend.breaker.record_failure()
+        return healthy
+
+    async def _probe_health(self, backend: Backend):
+        """Background health probe for one backend, run on its backoff schedule while its circuit is open"""
+        while True:
+            await asyncio.sleep(backend.breaker.next_probe_delay(self.health_check_interval))
+            await self._check_health(backend)
+
+    async def _iterate_on_io_loop(self, stream: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Drive an async iterator on the I/O loop and relay its items to the caller's loop"""
+        loop = self._get_io_loop()
+        caller_loop = asyncio.get_running_loop()
+        if caller_loop is loop:
+            async for item in stream:
+                yield item
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        def relay(item: Any, error: Optional[BaseException] = None):
+            try:
+                caller_loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+            except RuntimeError:
+                # Caller's loop is already closed; nobody is listening
+                pass
+        
+        async def pump():
+            try:
+                async for item in stream:
+                    relay(item)
+            except Exception as e:
+                relay(_END_OF_STREAM, e)
+            else:
+                relay(_END_OF_STREAM)
+        
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is _END_OF_STREAM:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    async def _admitted_call(self, priority: int, call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run a model call once the scheduler admits it, adding queue and network timings to the reply"""
+        queued = time.perf_counter()
+        async with self.scheduler.slot(priority):
+            started = time.perf_counter()
+            result = await call()
+        return dict(
+            result,
+            queue_duration=int((started - queued) * NS_PER_SECOND),
+            network_duration=int((time.perf_counter() - started) * NS_PER_SECOND)
+        )
+
+    async def _admitted_stream(self, priority: int, open_stream: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate a model stream while holding a scheduler slot, adding timings to the final chunk"""
+        queued = time.perf_counter()
+        async with self.scheduler.slot(priority):
+            started = time.perf_counter()
+            async for chunk in open_stream():
+                if chunk.get("done"):
+                    chunk = dict(
+                        chunk,
+                        queue_duration=int((started - queued) * NS_PER_SECOND),
+                        network_duration=int((time.perf_counter() - started) * NS_PER_SECOND)
+                    )
+                yield chunk
+
+    async def _close_session(self):
+        """Close the transport's pooled connections"""
+        await self.transport.close()
+
+    def submit(self, stream: AsyncIterator[Dict[str, Any]]) -> GenerationJob:
+        """Run a persona stream on the I/O loop and return a job the caller can poll"""
+        job = GenerationJob()
+        
+        async def run() -> Dict[str, Any]:
+            async for chunk in stream:
+                if chunk["done"]:
+                    return chunk
+                job.text += chunk["delta"]
+            raise Exception("Persona stream ended without a result")
+        
+        job.future = asyncio.run_coroutine_threadsafe(run(), self._get_io_loop())
+        return job
+
+    async def _warm_backend(self, backend: Backend, connections: int) -> Dict[str, Any]:
+        """Open pooled connections to a backend and load the model into its memory"""
+        started = time.perf_counter()
+        # Concurrent probes each leave a keep-alive connection in the pool
+        probes = await asyncio.gather(*(self._check_health(backend) for _ in range(connections)))
+        report: Dict[str, Any] = {
+            "url": backend.url,
+            "healthy": all(probes),
+            "connect_s": time.perf_counter() - started,
+            "preload_s": None,
+            "load_s": None
+        }
+        if not report["healthy"]:
+            return report
+        
+        # A generate request without a prompt only loads the model. It stays loaded
+        # for keep_alive after each request, so it is only pinned when keep_alive is
+        # negative; the fixed options stop the first real call reloading it
+        payload: Dict[str, Any] = {"model": self.model_name, "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.options:
+            payload["options"] = self.options
+        
+        preload_started = time.perf_counter()
+        try:
+            reply = await self.transport.post(f"{backend.url}/api/generate", payload)
+            report["preload_s"] = time.perf_counter() - preload_started
+            report["load_s"] = reply.get("load_duration", 0) / NS_PER_SECOND
+        except Exception as e:
+            print(f"Error preloading {self.model_name} on {backend.url}: {e}")
+        return report
+
+    async def _warm_up(self, connections: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        backends = await asyncio.gather(*(self._warm_backend(backend, connections) for backend in self.backends.backends))
+        return {"total_s": time.perf_counter() - started, "backends": backends}
+
+    async def warm_up(self, connections: int = 2) -> Dict[str, Any]:
+        """Preload the model and fill the connection pool on every backend"""
+        return await self._run_on_io_loop(self._warm_up(connections))
+
+    def start_warm_up(self, connections: int = 2) -> concurrent.futures.Future:
+        """Warm up on the I/O loop without blocking the caller"""
+        return asyncio.run_coroutine_threadsafe(self._warm_up(connections), self._get_io_loop())
+
+    def close(self):
+        """Close pooled connections and stop the I/O loop"""
+        with self._io_lock:
+            loop, thread = self._io_loop, self._io_thread
+            self._io_loop, self._io_thread = None, None
+        if loop is None:
+            return
+        for probe in self._health_probes:
+            probe.cancel()
+        self._health_probes = []
+        for summary in list(self._summaries):
+            summary.cancel()
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout=self.connect_timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join(timeout=self.connect_timeout)
+            if not loop.is_running():
+                loop.close()
+
+    def _build_request(
+        self,
+        prompt: str,
+        system_prompt: str,
+        stream: bool,
+        session_id: Optional[str]
+    ) -> Tuple[str, Dict[str, Any], Optional[ChatExchange]]:
+        """Build the endpoint and payload for a generation
+
+        With a session id the prompt is sent to /api/chat on top of the
+        session's history; without one it is a stateless /api/generate call.
+        """
+        payload: Dict[str, Any] = {
+            "model": self.model_name,
+            "stream": stream
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.options:
+            payload["options"] = self.options
+        
+        if session_id is None:
+            payload["prompt"] = prompt
+            payload["system"] = system_prompt
+            return "/api/generate", payload, None
+        
+        chat = self.chat_sessions.get(session_id, system_prompt)
+        self._compact_history(chat)
+        payload["messages"] = chat.request_messages(prompt)
+        return "/api/chat", payload, chat.start(prompt)
+
+    def _compact_history(self, chat: ChatSession):
+        """Take over-budget turns out of a session's history and summarize them in the background"""
+        overflow = chat.take_overflow()
+        if not overflow:
+            return
+        # The dropped turns are covered by the old summary until the new one lands;
+        # run on the I/O loop so the summary outlives the caller's loop
+        summary = asyncio.run_coroutine_threadsafe(self._summarize_history(chat, overflow), self._get_io_loop())
+        self._summaries.add(summary)
+        summary.add_done_callback(self._summaries.discard)
+
+    async def _summarize_history(self, chat: ChatSession, overflow: List[Dict[str, str]]):
+        """Fold dropped turns into the session's rolling summary"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in overflow)
+        payload = {
+            "model": self.model_name,
+            "stream": False,
+            "system": "You summarize training conversations between a trainer and a learner persona.",
+            "prompt": (
+                f"Earlier summary: {chat.summary or 'none'}\n\n{transcript}\n\n"
+                "Update the summary in at most four sentences: what the learner asked, "
+                "which suggestions helped, and what is still unresolved."
+            )
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.options:
+            payload["options"] = self.options
+        
+        summary = ""
+        try:
+            if self.backends.available():
+                result = await self._run_on_io_loop(
+                    self._admitted_call(PRIORITY_BACKGROUND, lambda: self._post("/api/generate", payload, None))
+                )
+                summary = self._reply_text(result)
+            else:
+                self.backends.record_short_circuit()
+        except Exception as e:
+            print(f"Error summarizing chat history: {e}")
+        finally:
+            if len(summary.strip()) < 20:
+                summary = chat.extractive_summary(overflow)
+            chat.add_summary(summary)
+
+    def _cache_key(self, payload: Dict[str, Any]) -> str:
+        """Cache and single-flight key for a request payload"""
+        if "messages" in payload:
+            return GenerationCache.make_key(self.model_name, "", json.dumps(payload["messages"]), payload.get("options"))
+        return GenerationCache.make_key(self.model_name, payload["system"], payload["prompt"], payload.get("options"))
+
+    @staticmethod
+    def _reply_text(chunk: Dict[str, Any]) -> str:
+        """Extract generated text from an /api/generate or /api/chat reply"""
+        if "message" in chunk:
+            return chunk["message"].get("content", "")
+        return chunk.get("response", "")
+
+    def _cached_reply(
+        self,
+        cache_key: str,
+        use_cache: bool,
+        semantic: Optional[Tuple[str, np.ndarray]]
+    ) -> Tuple[Optional[str], str]:
+        """Look a request up in the exact cache, then the semantic cache; returns (reply or None, outcome)"""
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached, 'cache'
+        if semantic is not None:
+            reused = self.semantic_cache.get(*semantic)
+            if reused is not None:
+                return reused, 'semantic'
+        return None, 'model'
+
+    def _store_reply(
+        self,
+        cache_key: str,
+        use_cache: bool,
+        semantic: Optional[Tuple[str, np.ndarray]],
+        response: str
+    ):
+        """Cache a successful reply for exact and near-duplicate reuse"""
+        if use_cache:
+            self.cache.set(cache_key, response)
+        if semantic is not None:
+            self.semantic_cache.add(*semantic, response)
+
+    async def call_ollama(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        use_cache: bool = True,
+        priority: int = PRIORITY_TURN,
+        session_id: Optional[str] = None,
+        semantic: Optional[Callable[[], Awaitable[Optional[Tuple[str, np.ndarray]]]]] = None
+    ) -> str:
+        """Call Ollama API with the given prompt
+
+        ``semantic`` returns a (scope, embedding key) pair from ``_semantic_key``;
+        with it, a near-duplicate of an earlier request reuses its reply. It is
+        awaited only once the request holds its place in the session history,
+        so a concurrent follow-up question cannot take that place first.
+        """
+        started = time.perf_counter()
+        metrics = CallMetrics(endpoint="", stream=False, outcome='model', total_s=0.0, session_id=session_id)
+        exchange = None
         try:
-            import aiohttp
+            endpoint, payload, exchange = self._build_request(prompt, system_prompt, False, session_id)
+            metrics.endpoint = endpoint
+            semantic_key = await semantic() if semantic is not None else None
             
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "system": system_prompt,
-                "stream": False
-            }
+            cache_key = self._cache_key(payload)
+            cached, metrics.outcome = self._cached_reply(cache_key, use_cache, semantic_key)
+            if cached is not None:
+                if exchange is not None:
+                    exchange.finish(cached)
+                return cached
+            
+            if not self.backends.available():
+                self.backends.record_short_circuit()
+                raise CircuitOpen("Ollama is unavailable")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/api/generate", json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("response", "")
-                    else:
-                        raise Exception(f"Ollama API error: {response.status}")
+            result = await self._run_on_io_loop(
+                self._single_flight.do(
+                    cache_key, lambda: self._admitted_call(priority, lambda: self._post(endpoint, payload, session_id))
+                )
+            )
+            metrics.apply_reply(result)
+            response = self._reply_text(result)
+            self._store_reply(cache_key, use_cache, semantic_key, response)
+            if exchange is not None:
+                exchange.finish(response)
+            return response
                         
+        except _SHED_ERRORS as e:
+            # Let the caller shed to its own template
+            metrics.outcome = 'shed'
+            metrics.error = str(e)
+            raise
         except Exception as e:
             print(f"Error calling Ollama: {e}")
+            metrics.outcome = 'fallback'
+            metrics.error = str(e)
             # Fallback to template-based responses for demo purposes
             return self._fallback_response(prompt)
+        finally:
+            # A failed call leaves nothing in the session's history
+            if exchange is not None:
+                exchange.abandon()
+            metrics.total_s = time.perf_counter() - started
+            self.metrics.record(metrics)
+
+    async def stream_ollama(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        use_cache: bool = True,
+        priority: int = PRIORITY_TURN,
+        session_id: Optional[str] = None,
+        semantic: Optional[Callable[[], Awaitable[Optional[Tuple[str, np.ndarray]]]]] = None
+    ) -> AsyncIterator[str]:
+        """Stream response tokens from the Ollama API as they are generated"""
+        started = time.perf_counter()
+        endpoint, payload, exchange = self._build_request(prompt, system_prompt, True, session_id)
+        metrics = CallMetrics(endpoint=endpoint, stream=True, outcome='model', total_s=0.0, session_id=session_id)
+        
+        received = []
+        try:
+            semantic_key = await semantic() if semantic is not None else None
+            cache_key = self._cache_key(payload)
+            cached, metrics.outcome = self._cached_reply(cache_key, use_cache, semantic_key)
+            if cached is not None:
+                metrics.first_token_s = time.perf_counter() - started
+                if exchange is not None:
+                    exchange.finish(cached)
+                yield cached
+                return
+            
+            if not self.backends.available():
+                self.backends.record_short_circuit()
+                raise CircuitOpen("Ollama is unavailable")
+            
+            async for chunk in self._iterate_on_io_loop(
+                self._single_flight.stream(
+                    cache_key, lambda: self._admitted_stream(priority, lambda: self._stream(endpoint, payload, session_id))
+                )
+            ):
+                if chunk.get("done"):
+                    metrics.apply_reply(chunk)
+                token = self._reply_text(chunk)
+                if token:
+                    if not received:
+                        metrics.first_token_s = time.perf_counter() - started
+                    received.append(token)
+                    yield token
+            
+            response = "".join(received)
+            self._store_reply(cache_key, use_cache, semantic_key, response)
+            if exchange is not None:
+                exchange.finish(response)
+        except _SHED_ERRORS as e:
+            metrics.outcome = 'shed'
+            metrics.error = str(e)
+            raise
+        except Exception as e:
+            print(f"Error streaming from Ollama: {e}")
+            metrics.outcome = 'fallback'
+            metrics.error = str(e)
+            # Only fall back if nothing was streamed yet, to avoid mixing output
+            if not received:
+                yield self._fallback_response(prompt)
+        finally:
+            # A failed or abandoned stream leaves nothing in the session's history
+            if exchange is not None:
+                exchange.abandon()
+            metrics.total_s = time.perf_counter() - started
+            self.metrics.record(metrics)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Per-call aggregates plus cache, scheduler, coalescing and backend state, as JSON-ready data"""
+        return {
+            "calls": self.metrics.snapshot(),
+            "cache": self.cache.stats(),
+            "semantic_cache": self.semantic_cache.stats(),
+            "scheduler": self.scheduler.stats(),
+            "single_flight": self._single_flight.stats(),
+            "backends": self.backends.stats()
+        }
+
+    def metrics_text(self) -> str:
+        """Per-call aggregates and service counters and gauges in the Prometheus text format"""
+        scheduler = self.scheduler.stats()
+        cache = self.cache.stats()
+        semantic = self.semantic_cache.stats()
+        counters = {
+            "ollama_scheduler_rejected_total": scheduler["rejected"],
+            "ollama_cache_hits_total": cache["hits"],
+            "ollama_cache_misses_total": cache["misses"],
+            "ollama_semantic_cache_hits_total": semantic["hits"],
+            "ollama_semantic_cache_misses_total": semantic["misses"],
+            "ollama_semantic_cache_evictions_total": semantic["evictions"],
+            "ollama_single_flight_coalesced_total": self._single_flight.stats()["coalesced"]
+        }
+        gauges = {
+            "ollama_scheduler_active": scheduler["active"],
+            "ollama_scheduler_queue_depth": scheduler["queue_depth"],
+            "ollama_scheduler_avg_wait_seconds": scheduler["avg_wait"],
+            "ollama_semantic_cache_entries": semantic["entries"]
+        }
+        return self.metrics.to_prometheus(counters, gauges)
 
     def _fallback_response(self, prompt: str) -> str:
         """Fallback response when Ollama is not available"""
         if "question" in prompt.lower():
-            return random.choice(self.question_templates)
+            return self.random.choice(self.question_templates)
         else:
             return "I understand your suggestion. Let me think about how to apply this to my situation."
 
-    async def generate_persona_question(self, persona: Persona, company: Company, message_history: List[Message]) -> str:
-        """Generate a question from the AI persona about the product"""
-        
-        # Count previous questions to determine complexity
-        question_count = len([m for m in message_history if m.type == 'persona_question'])
-        
-        # Create context for the AI
-        persona_context = f"""
+    def _session_context(self, persona: Persona, company: Company) -> str:
+        """System prompt shared by every call in a session, so Ollama can reuse its evaluation"""
+        return f"""
 You are {persona.name}, a {persona.role}. 
 Background: {persona.background}
 Expertise: {', '.join(persona.expertise) if persona.expertise else 'General knowledge'}
@@ -96,9 +688,17 @@ Expertise: {', '.join(persona.expertise) if persona.expertise else 'General know
 You are learning about {company.product} from {company.name}.
 Product description: {company.description}
 
-Generate a realistic question about {company.product} that someone in your role would ask.
+Ask realistic questions about {company.product} that someone in your role would ask, and respond honestly to the suggestions you receive.
 """
-        
+
+    def _question_count(self, message_history: MessageHistory) -> int:
+        """Count previous questions to determine complexity"""
+        if isinstance(message_history, Transcript):
+            return message_history.question_count
+        return len([m for m in message_history if m.type == 'persona_question'])
+
+    def _question_prompts(self, persona: Persona, company: Company, question_count: int) -> Tuple[str, str]:
+        """Build the (prompt, system prompt) pair for a persona question"""
         if question_count == 0:
             prompt = f"As {persona.name}, ask an introductory question about getting started with {company.product}. Keep it conversational and specific to your role as a {persona.role}."
         elif question_count < 3:
@@ -106,23 +706,64 @@ Generate a realistic question about {company.product} that someone in your role
         else:
             prompt = f"As {persona.name}, ask an advanced question about optimizing or integrating {company.product} with other tools."
         
+        return prompt, self._session_context(persona, company)
+
+    def _finish_question(self, persona: Persona, company: Company, question_count: int, response: str) -> str:
+        """Turn raw model output into the final question"""
+        # If Ollama response is too short or generic, use template
+        if len(response.strip()) < 20:
+            return self._get_template_question(persona, company, question_count)
+        return response.strip()
+
+    async def generate_persona_question(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> str:
+        """Generate a question from the AI persona about the product"""
+        
+        question_count = self._question_count(message_history)
+        prompt, persona_context = self._question_prompts(persona, company, question_count)
+        
+        # Only the opening question is cached; later tiers reuse the same prompt
+        # within a session, and caching them would repeat the same question
         try:
-            response = await self.call_ollama(prompt, persona_context)
-            # If Ollama response is too short or generic, use template
-            if len(response.strip()) < 20:
-                return self._get_template_question(persona, company, question_count)
-            return response.strip()
+            response = await self.call_ollama(
+                prompt, persona_context,
+                use_cache=question_count == 0,
+                priority=PRIORITY_OPENING if question_count == 0 else PRIORITY_TURN,
+                session_id=session_id
+            )
+            return self._finish_question(persona, company, question_count, response)
         except:
             return self._get_template_question(persona, company, question_count)
 
+    async def stream_persona_question(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a question from the AI persona, ending with the final question text"""
+        question_count = self._question_count(message_history)
+        prompt, persona_context = self._question_prompts(persona, company, question_count)
+        
+        response = ""
+        try:
+            async for token in self.stream_ollama(
+                prompt, persona_context,
+                use_cache=question_count == 0,
+                priority=PRIORITY_OPENING if question_count == 0 else PRIORITY_TURN,
+                session_id=session_id
+            ):
+                response += token
+                yield {"delta": token, "done": False}
+        except _SHED_ERRORS:
+            pass
+        except Exception as e:
+            print(f"Error streaming persona question: {e}")
+        
+        yield {"content": self._finish_question(persona, company, question_count, response), "done": True}
+
     def _get_template_question(self, persona: Persona, company: Company, question_count: int) -> str:
         """Get a template-based question as fallback"""
         if question_count == 0:
             template = self.question_templates[0]
         elif question_count < 3:
-            template = random.choice(self.question_templates[1:6])
+            template = self.random.choice(self.question_templates[1:6])
         else:
-            template = random.choice(self.question_templates[6:])
+            template = self.random.choice(self.question_templates[6:])
         
         question = template.format(product=company.product, role=persona.role, company=company.name)
         
@@ -131,56 +772,87 @@ Generate a realistic question about {company.product} that someone in your role
         
         return question
 
-    async def generate_persona_response(self, persona: Persona, company: Company, message_history: List[Message]) -> Dict[str, Any]:
-        """Generate a response from the AI persona to a user suggestion"""
-        
-        # Get the last user suggestion
-        last_suggestion = None
+    def _last_message(self, message_history: MessageHistory, message_type: MessageType) -> Optional[Message]:
+        """Get the most recent message of a type"""
+        if isinstance(message_history, Transcript):
+            return message_history.last(message_type)
         for message in reversed(message_history):
-            if message.type == 'user_suggestion':
-                last_suggestion = message
-                break
-        
-        if not last_suggestion:
-            return {
-                "content": "I didn't receive any suggestion. Could you please provide some guidance?",
-                "status": "unclear"
-            }
-        
-        # Analyze suggestion quality
-        suggestion_length = len(last_suggestion.content)
-        has_specific_terms = any(term in last_suggestion.content.lower() for term in 
-                                ['step', 'how', 'guide', 'tutorial', 'example', 'feature', 'setting', 'configure'])
-        mentions_product = company.product.lower() in last_suggestion.content.lower()
-        
-        # Determine response status
-        if suggestion_length > 100 and has_specific_terms and mentions_product:
-            status = 'satisfied' if random.random() > 0.3 else 'needs_more'
-        elif suggestion_length > 50 and (has_specific_terms or mentions_product):
-            status = 'needs_more' if random.random() > 0.5 else 'satisfied'
-        else:
-            status = 'unclear' if random.random() > 0.7 else 'needs_more'
+            if message.type == message_type:
+                return message
+        return None
+
+    def _last_suggestion(self, message_history: MessageHistory) -> Optional[Message]:
+        """Get the most recent user suggestion"""
+        return self._last_message(message_history, MessageType.USER_SUGGESTION)
+
+    def _last_question(self, message_history: MessageHistory) -> Optional[Message]:
+        """Get the question the latest suggestion answers"""
+        return self._last_message(message_history, MessageType.PERSONA_QUESTION)
+
+    def _assess_suggestion(self, company: Company, suggestion: Message) -> str:
+        """Pick the response status for a suggestion"""
+        return self.scorer.assess(suggestion.content, company.product, self.random)
+
+    def _response_prompts(self, persona: Persona, company: Company, suggestion: Message) -> Tuple[str, str]:
+        """Build the (prompt, system prompt) pair for a persona response"""
+        prompt = (
+            f"Respond to this suggestion about {company.product}: '{suggestion.content}'. "
+            f"As {persona.name}, evaluate whether it helps with what you asked, and make clear if you're satisfied, "
+            f"need more help, or found the suggestion unclear. Be conversational and authentic."
+        )
         
-        # Create context for AI response
-        persona_context = f"""
-You are {persona.name}, a {persona.role}.
-Background: {persona.background}
-You asked a question about {company.product} and received this suggestion: "{last_suggestion.content}"
+        return prompt, self._session_context(persona, company)
 
-Respond as {persona.name} would, evaluating if the suggestion helps answer your question.
-Your response should indicate if you're satisfied, need more help, or found the suggestion unclear.
-"""
+    async def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Embed texts with the embedding model, or locally when none is set; None if that fails"""
+        if self.embedding_model is None:
+            return self.embedder.embed(texts)
+        if not self.backends.available():
+            return None
+        
+        payload: Dict[str, Any] = {"model": self.embedding_model, "input": texts}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
         
-        prompt = f"Respond to this suggestion about {company.product}: '{last_suggestion.content}'. Be conversational and authentic."
+        async def post() -> Dict[str, Any]:
+            # Bypasses the circuit breaker: a missing embedding model must not
+            # take generation offline
+            backend = self.backends.acquire()
+            try:
+                return await self.transport.post(f"{backend.url}/api/embed", payload)
+            finally:
+                self.backends.release(backend)
         
         try:
-            ai_response = await self.call_ollama(prompt, persona_context)
-            if len(ai_response.strip()) < 20:
-                content = self._get_template_response(persona, company, status)
-            else:
-                content = ai_response.strip()
-        except:
+            reply = await self._run_on_io_loop(post())
+            return np.asarray(reply["embeddings"], dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding with {self.embedding_model}: {e}")
+            return None
+
+    async def _semantic_key(
+        self,
+        persona_context: str,
+        status: str,
+        question: Optional[Message],
+        suggestion: Message
+    ) -> Optional[Tuple[str, np.ndarray]]:
+        """(scope, key) for reusing responses to near-duplicate suggestions, or None to skip the semantic cache"""
+        if self.semantic_cache.max_entries_per_scope <= 0:
+            return None
+        key = await self._embed([question.content if question else "", suggestion.content])
+        if key is None:
+            return None
+        # Responses only carry over within one persona and company, and for the same status
+        scope = GenerationCache.make_key(self.embedding_model or "", persona_context, status)
+        return scope, key
+
+    def _finish_response(self, persona: Persona, company: Company, status: str, ai_response: str) -> str:
+        """Turn raw model output into the final response content"""
+        if len(ai_response.strip()) < 20:
             content = self._get_template_response(persona, company, status)
+        else:
+            content = ai_response.strip()
         
         # Add follow-up context for 'needs_more' responses
         if status == 'needs_more':
@@ -191,15 +863,160 @@ Your response should indicate if you're satisfied, need more help, or found the
                 " What would be the timeline for getting this set up?",
                 " Are there any prerequisites I should be aware of?"
             ]
-            content += random.choice(follow_ups)
+            content += self.random.choice(follow_ups)
+        
+        return content
+
+    async def _respond(
+        self,
+        persona: Persona,
+        company: Company,
+        question: Optional[Message],
+        suggestion: Message,
+        status: str,
+        session_id: Optional[str] = None
+    ) -> str:
+        """Generate the response content for a suggestion with a known status"""
+        prompt, persona_context = self._response_prompts(persona, company, suggestion)
+        
+        try:
+            ai_response = await self.call_ollama(
+                prompt, persona_context, session_id=session_id,
+                semantic=lambda: self._semantic_key(persona_context, status, question, suggestion)
+            )
+        except:
+            ai_response = ""
+        
+        return self._finish_response(persona, company, status, ai_response)
+
+    async def _stream_respond(
+        self,
+        persona: Persona,
+        company: Company,
+        question: Optional[Message],
+        suggestion: Message,
+        status: str,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the response content for a suggestion with a known status"""
+        prompt, persona_context = self._response_prompts(persona, company, suggestion)
+        
+        ai_response = ""
+        try:
+            async for token in self.stream_ollama(
+                prompt, persona_context, session_id=session_id,
+                semantic=lambda: self._semantic_key(persona_context, status, question, suggestion)
+            ):
+                ai_response += token
+                yield {"delta": token, "done": False}
+        except _SHED_ERRORS:
+            pass
+        except Exception as e:
+            print(f"Error streaming persona response: {e}")
+        
+        yield {
+            "content": self._finish_response(persona, company, status, ai_response),
+            "status": status,
+            "done": True
+        }
+
+    async def generate_persona_response(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate a response from the AI persona to a user suggestion"""
+        
+        # Get the last user suggestion
+        last_suggestion = self._last_suggestion(message_history)
+        
+        if not last_suggestion:
+            return {
+                "content": _NO_SUGGESTION_REPLY,
+                "status": "unclear"
+            }
+        
+        status = self._assess_suggestion(company, last_suggestion)
         
         return {
-            "content": content,
+            "content": await self._respond(persona, company, self._last_question(message_history), last_suggestion, status, session_id),
             "status": status
         }
 
+    async def stream_persona_response(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response from the AI persona, ending with the final content and status"""
+        last_suggestion = self._last_suggestion(message_history)
+        
+        if not last_suggestion:
+            yield {
+                "content": _NO_SUGGESTION_REPLY,
+                "status": "unclear",
+                "done": True
+            }
+            return
+        
+        status = self._assess_suggestion(company, last_suggestion)
+        async for chunk in self._stream_respond(persona, company, self._last_question(message_history), last_suggestion, status, session_id):
+            yield chunk
+
+    def _start_follow_up(self, persona: Persona, company: Company, message_history: MessageHistory, status: str, session_id: Optional[str] = None) -> Optional[asyncio.Task]:
+        """Start generating the follow-up question alongside the response when one will be needed"""
+        # The status is picked before the model is called, and the response does
+        # not change the question count, so the follow-up never has to be discarded
+        if status != 'needs_more':
+            return None
+        return asyncio.ensure_future(self.generate_persona_question(persona, company, message_history, session_id))
+
+    async def generate_turn(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate the persona's response and, if more help is needed, its follow-up question concurrently"""
+        last_suggestion = self._last_suggestion(message_history)
+        
+        if not last_suggestion:
+            return {
+                "content": _NO_SUGGESTION_REPLY,
+                "status": "unclear",
+                "follow_up": None
+            }
+        
+        status = self._assess_suggestion(company, last_suggestion)
+        follow_up_task = self._start_follow_up(persona, company, message_history, status, session_id)
+        
+        try:
+            content = await self._respond(persona, company, self._last_question(message_history), last_suggestion, status, session_id)
+            follow_up = await follow_up_task if follow_up_task else None
+        finally:
+            if follow_up_task and not follow_up_task.done():
+                follow_up_task.cancel()
+        
+        return {
+            "content": content,
+            "status": status,
+            "follow_up": follow_up
+        }
+
+    async def stream_turn(self, persona: Persona, company: Company, message_history: MessageHistory, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the persona's response while its follow-up question is generated concurrently"""
+        last_suggestion = self._last_suggestion(message_history)
+        
+        if not last_suggestion:
+            yield {
+                "content": _NO_SUGGESTION_REPLY,
+                "status": "unclear",
+                "follow_up": None,
+                "done": True
+            }
+            return
+        
+        status = self._assess_suggestion(company, last_suggestion)
+        follow_up_task = self._start_follow_up(persona, company, message_history, status, session_id)
+        
+        try:
+            async for chunk in self._stream_respond(persona, company, self._last_question(message_history), last_suggestion, status, session_id):
+                if chunk["done"]:
+                    chunk["follow_up"] = await follow_up_task if follow_up_task else None
+                yield chunk
+        finally:
+            if follow_up_task and not follow_up_task.done():
+                follow_up_task.cancel()
+
     def _get_template_response(self, persona: Persona, company: Company, status: str) -> str:
         """Get a template-based response as fallback"""
         templates = self.response_templates[status]
-        response = random.choice(templates)
+        response = self.random.choice(templates)
         return response.format(product=company.product, role=persona.role, company=company.name)
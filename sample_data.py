@@ -0,0 +1,65 @@
+from models import Persona, Company
+
+# Sample companies data
+SAMPLE_COMPANIES = [
+    Company(
+        id="1",
+        name="TechFlow",
+        product="Project Management Software",
+        description="Advanced project management tool with AI-powered insights and team collaboration features.",
+        category="Software"
+    ),
+    Company(
+        id="2",
+        name="CloudSync",
+        product="Cloud Storage Platform",
+        description="Secure cloud storage with real-time synchronization and advanced sharing capabilities.",
+        category="Cloud"
+    ),
+    Company(
+        id="3",
+        name="MobileFirst",
+        product="Mobile App Development Platform",
+        description="No-code platform for creating professional mobile applications with drag-and-drop interface.",
+        category="Mobile"
+    ),
+    Company(
+        id="4",
+        name="EcommPlus",
+        product="E-commerce Analytics Dashboard",
+        description="Comprehensive analytics platform for online stores with sales tracking and customer insights.",
+        category="E-commerce"
+    ),
+    Company(
+        id="5",
+        name="GameStudio",
+        product="Game Development Engine",
+        description="Cross-platform game development engine with visual scripting and asset management.",
+        category="Gaming"
+    )
+]
+
+# Preset personas for headless runs
+SAMPLE_PERSONAS = [
+    Persona(
+        id="1",
+        name="Alex",
+        role="Software Developer",
+        background="Mid-level developer moving a small team onto new tooling.",
+        expertise=["Python", "Web Development"]
+    ),
+    Persona(
+        id="2",
+        name="Jordan",
+        role="Marketing Manager",
+        background="Runs campaigns for a growing startup and has little technical background.",
+        expertise=[]
+    ),
+    Persona(
+        id="3",
+        name="Sam",
+        role="Student",
+        background="Final-year student exploring tools for a capstone project.",
+        expertise=["Data Analysis"]
+    )
+]
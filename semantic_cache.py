@@ -0,0 +1,159 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """Local stand-in for an embedding model, with no model calls
+
+    Hashes words, word pairs and character trigrams into a fixed number of
+    signed buckets and L2-normalizes the result, so repeats that differ in
+    case, punctuation or a few words land close together. It measures
+    surface overlap, not meaning; an embedding model is needed to match
+    real paraphrases.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"^{word}$"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """One unit-length row per text; empty texts give zero rows"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in self._features(text)], dtype=np.uint32)
+            if not len(hashes):
+                continue
+            # The top bit picks the sign, so collisions tend to cancel out
+            signs = np.where(hashes >> 31, -1.0, 1.0)
+            vectors[row] = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+            norm = np.linalg.norm(vectors[row])
+            if norm:
+                vectors[row] /= norm
+        return vectors
+
+class _ScopeIndex:
+    """Keys and responses for one scope, in preallocated rows"""
+
+    __slots__ = ('vectors', 'responses', 'used', 'size')
+
+    def __init__(self, capacity: int, shape: Tuple[int, int]):
+        self.vectors = np.zeros((capacity,) + shape, dtype=np.float32)
+        self.responses: List[Optional[str]] = [None] * capacity
+        # Logical clock of each row's last hit or insert, for LRU eviction
+        self.used = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+class SemanticCache:
+    """Nearest-neighbour cache of responses, keyed by embedding similarity within a scope
+
+    A key is one embedding per part (say, the question and the suggestion
+    it answers), and matches a stored key only if every part reaches
+    ``threshold`` cosine similarity, so a shared part cannot carry a
+    different one over the line. Each scope (one persona, company and
+    response status) keeps its keys in a NumPy array, so a lookup is one
+    batched product over at most ``max_entries_per_scope`` rows. Full
+    scopes overwrite their least recently used row, and the least recently
+    used scope is dropped once there are more than ``max_scopes``.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries_per_scope: int = 256, max_scopes: int = 1024):
+        self.threshold = threshold
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[str, _ScopeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(key: Any) -> Optional[np.ndarray]:
+        """Key as unit-length rows, one per part; None if any part is empty"""
+        key = np.atleast_2d(np.asarray(key, dtype=np.float32))
+        norms = np.linalg.norm(key, axis=1, keepdims=True)
+        return key / norms if norms.all() else None
+
+    def _nearest(self, index: _ScopeIndex, key: np.ndarray) -> int:
+        """Row whose weakest part is most similar, if that reaches the threshold, or -1"""
+        if not index.size or index.vectors.shape[1:] != key.shape:
+            return -1
+        similarities = np.einsum('npd,pd->np', index.vectors[:index.size], key).min(axis=1)
+        row = int(np.argmax(similarities))
+        return row if similarities[row] >= self.threshold else -1
+
+    def get(self, scope: str, key: Any) -> Optional[str]:
+        """Response stored under the nearest key in the scope, or None below the threshold"""
+        key = self._normalize(key)
+        with self._lock:
+            index = self._scopes.get(scope)
+            row = self._nearest(index, key) if index is not None and key is not None else -1
+            if row < 0:
+                self.misses += 1
+                return None
+            self._clock += 1
+            index.used[row] = self._clock
+            self._scopes.move_to_end(scope)
+            self.hits += 1
+            return index.responses[row]
+
+    def add(self, scope: str, key: Any, response: str):
+        """Store a response; a near-duplicate key already in the scope is replaced rather than repeated"""
+        key = self._normalize(key)
+        if key is None or self.max_entries_per_scope <= 0:
+            return
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None or index.vectors.shape[1:] != key.shape:
+                # New scope, or the embedding model changed
+                index = self._scopes[scope] = _ScopeIndex(self.max_entries_per_scope, key.shape)
+            self._scopes.move_to_end(scope)
+            while len(self._scopes) > self.max_scopes:
+                _, dropped = self._scopes.popitem(last=False)
+                self.evictions += dropped.size
+
+            row = self._nearest(index, key)
+            if row < 0:
+                if index.size < self.max_entries_per_scope:
+                    row = index.size
+                    index.size += 1
+                else:
+                    row = int(np.argmin(index.used))
+                    self.evictions += 1
+            self._clock += 1
+            index.vectors[row] = key
+            index.responses[row] = response
+            index.used[row] = self._clock
+
+    def clear(self):
+        """Remove every stored response"""
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "scopes": len(self._scopes),
+                "entries": sum(index.size for index in self._scopes.values()),
+                "threshold": self.threshold
+            }
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List, Tuple
+from models import Persona, Company, Message, MessageType, ResponseStatus
+from transcript import Transcript
+
+# Turn logic shared by the Streamlit chat interface and the headless simulator
+
+def add_session_started(transcript: Transcript, persona: Persona, company: Company) -> Message:
+    """System message that opens a session"""
+    return transcript.add(
+        MessageType.SYSTEM,
+        f"Session started: {persona.name} ({persona.role}) will ask questions about {company.product} from {company.name}. Provide helpful suggestions to assist them."
+    )
+
+def add_question(transcript: Transcript, content: str) -> Message:
+    """Persona question from a finished question generation"""
+    return transcript.add(MessageType.PERSONA_QUESTION, content)
+
+def add_suggestion(transcript: Transcript, content: str) -> Message:
+    """User suggestion submitted in reply to the persona"""
+    return transcript.add(MessageType.USER_SUGGESTION, content)
+
+def add_turn(transcript: Transcript, persona: Persona, company: Company, result: Dict[str, Any]) -> Tuple[List[Message], bool]:
+    """Messages produced by a finished turn, and whether the session stays active"""
+    status = ResponseStatus(result['status'])
+    messages = [transcript.add(MessageType.PERSONA_RESPONSE, result['content'], status)]
+
+    # Handle follow-up based on status
+    if status is ResponseStatus.NEEDS_MORE and result['follow_up']:
+        messages.append(transcript.add(MessageType.PERSONA_QUESTION, result['follow_up']))
+
+    elif status is ResponseStatus.SATISFIED:
+        # End session
+        messages.append(transcript.add(
+            MessageType.SYSTEM,
+            f"Session completed! {persona.name} feels confident about using {company.product}. Great job providing helpful suggestions!"
+        ))
+        return messages, False
+
+    return messages, True
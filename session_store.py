@@ -0,0 +1,289 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from models import Persona, Company, Message, MessageType, ResponseStatus
+from transcript import Transcript, MESSAGE_TYPES, RESPONSE_STATUSES, TYPE_CODES, STATUS_CODES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS personas (
+    rowid INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS companies (
+    rowid INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    persona_rowid INTEGER NOT NULL REFERENCES personas (rowid),
+    company_rowid INTEGER NOT NULL REFERENCES companies (rowid),
+    active INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions (id),
+    seq INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (session_id, seq)
+);
+"""
+
+class TranscriptConflict(Exception):
+    """Raised when a message is appended to a transcript that another writer has moved past"""
+
+@dataclass
+class StoredSession:
+    """A saved training session, without its messages"""
+    id: str
+    persona: Persona
+    company: Company
+    active: bool
+    message_count: int
+    created_at: float
+    updated_at: float
+
+class SessionStore:
+    """SQLite store of training sessions, so they survive reloads and restarts
+
+    Uses WAL mode so appends from one session do not block reads from
+    others. Personas and companies are stored once per distinct content,
+    messages are appended one row at a time and read back in pages.
+    """
+
+    def __init__(self, db_path: str = "sessions.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent without an fsync per append
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    @staticmethod
+    def _fingerprint(data: Dict[str, Any]) -> str:
+        """Content hash that ignores the generated id, so re-created records deduplicate"""
+        content = {key: value for key, value in data.items() if key != "id"}
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _save_record(self, table: str, data: Dict[str, Any]) -> int:
+        """Insert a persona or company unless the same content is stored, returning its row id"""
+        fingerprint = self._fingerprint(data)
+        self._db.execute(
+            f"INSERT OR IGNORE INTO {table} (fingerprint, data) VALUES (?, ?)",
+            (fingerprint, json.dumps(data))
+        )
+        return self._db.execute(f"SELECT rowid FROM {table} WHERE fingerprint = ?", (fingerprint,)).fetchone()[0]
+
+    def create_session(self, session_id: str, persona: Persona, company: Company):
+        """Save a new session for a persona and company"""
+        now = time.time()
+        with self._lock:
+            persona_rowid = self._save_record("personas", asdict(persona))
+            company_rowid = self._save_record("companies", asdict(company))
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, persona_rowid, company_rowid, active, created_at, updated_at) "
+                "VALUES (?, ?, ?, 1, ?, ?)",
+                (session_id, persona_rowid, company_rowid, now, now)
+            )
+            self._db.commit()
+
+    def append_message(self, session_id: str, message: Message):
+        """Save one message; its id must be the session's next position
+
+        Raises TranscriptConflict, without saving anything, if another writer
+        (say, the same session open in a second tab) already took that
+        position.
+        """
+        with self._lock:
+            next_seq = self._db.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            if message.id != next_seq:
+                raise TranscriptConflict(f"Session {session_id} already has {next_seq - 1} messages, expected {message.id - 1}")
+            try:
+                self._db.execute(
+                    "INSERT INTO messages (session_id, seq, type, status, content, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, message.id, TYPE_CODES[message.type], STATUS_CODES[message.status], message.content, message.created)
+                )
+                self._db.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (message.created, session_id))
+                self._db.commit()
+            except sqlite3.IntegrityError:
+                # Another process wrote the same position first
+                self._db.rollback()
+                raise TranscriptConflict(f"Session {session_id} already has message {message.id}")
+
+    def set_active(self, session_id: str, active: bool):
+        with self._lock:
+            self._db.execute(
+                "UPDATE sessions SET active = ?, updated_at = ? WHERE id = ?",
+                (int(active), time.time(), session_id)
+            )
+            self._db.commit()
+
+    def load_session(self, session_id: str) -> Optional[StoredSession]:
+        """Get a session's persona, company and state, or None if it is unknown"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT p.data, c.data, s.active, s.created_at, s.updated_at, "
+                "(SELECT COUNT(*) FROM messages m WHERE m.session_id = s.id) "
+                "FROM sessions s JOIN personas p ON p.rowid = s.persona_rowid "
+                "JOIN companies c ON c.rowid = s.company_rowid WHERE s.id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return StoredSession(
+            id=session_id,
+            persona=Persona(**json.loads(row[0])),
+            company=Company(**json.loads(row[1])),
+            active=bool(row[2]),
+            message_count=row[5],
+            created_at=row[3],
+            updated_at=row[4]
+        )
+
+    def load_messages(self, session_id: str, start: int, stop: int) -> List[Message]:
+        """Messages with indexes in [start, stop)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, type, status, content, created FROM messages "
+                "WHERE session_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                (session_id, start, stop)
+            ).fetchall()
+        return [
+            Message(id=seq, type=MESSAGE_TYPES[type_code], content=content, status=RESPONSE_STATUSES[status_code], created=created)
+            for seq, type_code, status_code, content, created in rows
+        ]
+
+    def message_summary(self, session_id: str) -> List[Tuple[int, int, int]]:
+        """(type code, message count, seq of the latest one) for each message type in a session"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT type, COUNT(*), MAX(seq) FROM messages WHERE session_id = ? GROUP BY type", (session_id,)
+            ).fetchall()
+
+    def iter_suggestions(self, batch_size: int = 10000) -> Iterator[List[Tuple[str, str]]]:
+        """Every stored suggestion with its company's product, in batches of (content, product)
+
+        Pages by primary key, so memory stays bounded and the lock is only
+        held while a batch is read.
+        """
+        after: Tuple[str, int] = ("", 0)
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT m.session_id, m.seq, m.content, json_extract(c.data, '$.product') FROM messages m "
+                    "JOIN sessions s ON s.id = m.session_id JOIN companies c ON c.rowid = s.company_rowid "
+                    "WHERE m.type = ? AND (m.session_id, m.seq) > (?, ?) ORDER BY m.session_id, m.seq LIMIT ?",
+                    (TYPE_CODES[MessageType.USER_SUGGESTION], after[0], after[1], batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [(content, product) for _, _, content, product in rows]
+            after = (rows[-1][0], rows[-1][1])
+
+    def iter_message_rows(self, after_id: int = 0, batch_size: int = 1000) -> Iterator[List[Tuple[Any, ...]]]:
+        """Messages with insert ids above ``after_id``, in the order they were written, in batches
+
+        Rows are (insert id, session id, seq, type code, status code,
+        content, created, persona rowid, persona json, company rowid,
+        company json). Insert ids follow commit order and are never reused,
+        unlike creation times, so a position in this sequence is a safe
+        cursor. Pages by id, so memory stays bounded and the lock is only
+        held while a batch is read.
+        """
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT m.id, m.session_id, m.seq, m.type, m.status, m.content, m.created, "
+                    "p.rowid, p.data, c.rowid, c.data FROM messages m "
+                    "JOIN sessions s ON s.id = m.session_id "
+                    "JOIN personas p ON p.rowid = s.persona_rowid "
+                    "JOIN companies c ON c.rowid = s.company_rowid "
+                    "WHERE m.id > ? ORDER BY m.id LIMIT ?",
+                    (after_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class StoredTranscript(Transcript):
+    """Transcript that writes through to a SessionStore and keeps only recent messages in memory
+
+    Counts and latest-message pointers are loaded from the store, so
+    turns stay O(1) after a resume without reading the whole history; older
+    messages are paged in from SQLite when displayed.
+    """
+
+    def __init__(self, store: SessionStore, session_id: str, window: int = 50):
+        super().__init__()
+        self.store = store
+        self.session_id = session_id
+        self.window = window
+
+        total = 0
+        for type_code, count, last_seq in store.message_summary(session_id):
+            self._counts[type_code] = count
+            self._last[type_code] = last_seq - 1
+            total += count
+
+        self._offset = max(total - window, 0)
+        for message in store.load_messages(session_id, self._offset, total):
+            self._append_columns(TYPE_CODES[message.type], STATUS_CODES[message.status], message.created, message.content)
+
+    def add(self, message_type, content, status=None) -> Message:
+        """Save a message, then append it; raises TranscriptConflict if the session moved on elsewhere"""
+        message = Message(
+            id=len(self) + 1,
+            type=MessageType(message_type),
+            content=content,
+            status=ResponseStatus(status) if status is not None else None,
+            created=time.time()
+        )
+        # Written first, so a failed write leaves the transcript as it was
+        self.store.append_message(self.session_id, message)
+        self._append(TYPE_CODES[message.type], STATUS_CODES[message.status], message.created, message.content)
+
+        # Drop the older half of the window once it has doubled, so trimming is amortized O(1)
+        if len(self._contents) > 2 * self.window:
+            excess = len(self._contents) - self.window
+            del self._types[:excess]
+            del self._statuses[:excess]
+            del self._created[:excess]
+            del self._contents[:excess]
+            self._offset += excess
+        return message
+
+    def _message(self, index: int) -> Message:
+        if index < self._offset:
+            return self.store.load_messages(self.session_id, index, index + 1)[0]
+        return super()._message(index)
+
+    def page(self, start: int, stop: int) -> List[Message]:
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= self._offset:
+            return super().page(start, stop)
+        # One query for the part that is only in the store
+        stored = self.store.load_messages(self.session_id, start, min(stop, self._offset))
+        return stored + super().page(self._offset, stop)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self.page(0, len(self)))
@@ -0,0 +1,210 @@
+"""Headless load generator for the persona training flow
+
+Runs many persona x company sessions end to end against OllamaService,
+using the same turn logic as the Streamlit chat interface, and reports
+throughput, per-turn latency percentiles and status distributions.
+
+    python simulator.py --sessions 100 --concurrency 20 --max-turns 6
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import session_flow
+from backend_pool import BackendPool
+from generation_cache import GenerationCache
+from semantic_cache import SemanticCache
+from models import Persona, Company
+from ollama_service import OllamaService
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from transcript import Transcript
+from transports import open_transport
+
+# Suggestions of varying quality, so all three statuses come up
+SCRIPTED_SUGGESTIONS = [
+    "Try the docs.",
+    "Have a look around the settings page.",
+    "Check out the getting started guide for {product}, it covers the basics.",
+    "Start with the tutorial in {product}, then configure your workspace settings.",
+    "Go to settings and configure your profile first, then follow the onboarding guide step by step.",
+    "In {product}, open the settings, configure notifications and permissions, then follow the step by step guide. For example, as a {role} you would start with the dashboard feature.",
+    "Here is how I would approach {product}: step one, configure the core settings; step two, work through the tutorial with a real example from your work as a {role}; step three, explore the reporting feature."
+]
+
+class SimulationStats:
+    """Latency samples and counters collected across sessions"""
+
+    def __init__(self):
+        self.turn_latencies: List[float] = []
+        self.first_token_latencies: List[float] = []
+        self.opening_latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.sessions = 0
+        self.completed_sessions = 0
+        self.turns = 0
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0
+    }
+
+def make_suggestion(persona: Persona, company: Company, rng: random.Random) -> str:
+    return rng.choice(SCRIPTED_SUGGESTIONS).format(product=company.product, role=persona.role)
+
+async def timed_stream(stream) -> Dict[str, Any]:
+    """Consume a persona stream, returning its final chunk with timing attached"""
+    start = time.perf_counter()
+    first_token: Optional[float] = None
+    async for chunk in stream:
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        if chunk["done"]:
+            chunk["latency"] = time.perf_counter() - start
+            chunk["first_token"] = first_token
+            return chunk
+    raise Exception("Persona stream ended without a result")
+
+async def run_session(
+    service: OllamaService,
+    persona: Persona,
+    company: Company,
+    max_turns: int,
+    rng: random.Random,
+    stats: SimulationStats
+):
+    """Drive one session from the opening question until it completes or runs out of turns"""
+    session_id = uuid.uuid4().hex
+    messages = Transcript()
+    session_flow.add_session_started(messages, persona, company)
+
+    opening = await timed_stream(service.stream_persona_question(persona, company, [], session_id=session_id))
+    stats.opening_latencies.append(opening["latency"])
+    session_flow.add_question(messages, opening["content"])
+
+    active = True
+    for _ in range(max_turns):
+        session_flow.add_suggestion(messages, make_suggestion(persona, company, rng))
+        result = await timed_stream(service.stream_turn(persona, company, messages, session_id=session_id))
+
+        stats.turns += 1
+        stats.turn_latencies.append(result["latency"])
+        stats.first_token_latencies.append(result["first_token"])
+        stats.statuses[result["status"]] += 1
+
+        _, active = session_flow.add_turn(messages, persona, company, result)
+        if not active:
+            break
+
+    stats.sessions += 1
+    if not active:
+        stats.completed_sessions += 1
+    service.chat_sessions.discard(session_id)
+
+async def run_simulation(
+    service: OllamaService,
+    sessions: int,
+    concurrency: int,
+    max_turns: int,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run sessions under a concurrency limit and build a report"""
+    rng = random.Random(seed)
+    stats = SimulationStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    pairs = itertools.cycle(itertools.product(SAMPLE_PERSONAS, SAMPLE_COMPANIES))
+
+    async def bounded(persona: Persona, company: Company):
+        async with semaphore:
+            await run_session(service, persona, company, max_turns, rng, stats)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(*next(pairs)) for _ in range(sessions)))
+    duration = time.perf_counter() - start
+
+    return {
+        "sessions": stats.sessions,
+        "completed_sessions": stats.completed_sessions,
+        "turns": stats.turns,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "throughput_turns_per_s": stats.turns / duration if duration else 0.0,
+        "opening_latency_s": summarize(stats.opening_latencies),
+        "turn_latency_s": summarize(stats.turn_latencies),
+        "first_token_s": summarize(stats.first_token_latencies),
+        "statuses": dict(stats.statuses),
+        "scheduler": service.scheduler.stats(),
+        "cache": service.cache.stats(),
+        "semantic_cache": service.semantic_cache.stats()
+    }
+
+def print_report(report: Dict[str, Any]):
+    print(f"Sessions: {report['sessions']} ({report['completed_sessions']} completed), turns: {report['turns']}")
+    print(f"Duration: {report['duration_s']:.2f}s, throughput: {report['throughput_turns_per_s']:.2f} turns/s")
+    for label, key in [("Opening question", "opening_latency_s"), ("Turn", "turn_latency_s"), ("First token", "first_token_s")]:
+        summary = report[key]
+        print(
+            f"{label:>16}: p50 {summary['p50'] * 1000:.0f}ms  p95 {summary['p95'] * 1000:.0f}ms  "
+            f"p99 {summary['p99'] * 1000:.0f}ms  max {summary['max'] * 1000:.0f}ms"
+        )
+    print(f"Statuses: {report['statuses']}")
+    print(f"Scheduler: {report['scheduler']}")
+    semantic = report["semantic_cache"]
+    print(f"Semantic cache: {semantic['hits']} hits ({semantic['hit_rate']:.0%}), {semantic['entries']} entries, {semantic['evictions']} evicted")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless persona sessions against Ollama")
+    parser.add_argument("--sessions", type=int, default=20, help="Total sessions to run")
+    parser.add_argument("--concurrency", type=int, default=5, help="Sessions running at once")
+    parser.add_argument("--max-turns", type=int, default=6, help="Suggestions per session before giving up")
+    parser.add_argument("--hosts", help='Ollama hosts as "url[=weight],..." (default: localhost)')
+    parser.add_argument("--slots-per-host", type=int, default=4, help="Concurrent model calls per host at weight 1")
+    parser.add_argument("--seed", type=int, help="Seed for suggestion choice and status draws")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the generation and semantic caches")
+    parser.add_argument("--embedding-model", help="Ollama model for semantic cache keys (default: local hashing)")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--record", help="Record every Ollama exchange to this cassette file")
+    parser.add_argument("--replay", help="Answer Ollama requests from this cassette instead of a host")
+    parser.add_argument("--realtime", action="store_true", help="Replay with the recorded timings instead of instantly")
+    args = parser.parse_args()
+
+    service = OllamaService(
+        backends=BackendPool.from_spec(args.hosts) if args.hosts else None,
+        slots_per_backend=args.slots_per_host,
+        cache=GenerationCache(max_entries=0) if args.no_cache else None,
+        semantic_cache=SemanticCache(max_entries_per_scope=0) if args.no_cache else None,
+        embedding_model=args.embedding_model,
+        transport=open_transport(args.record, args.replay, args.realtime),
+        seed=args.seed
+    )
+    try:
+        report = asyncio.run(run_simulation(service, args.sessions, args.concurrency, args.max_turns, args.seed))
+    finally:
+        service.close()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
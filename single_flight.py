@@ -0,0 +1,109 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+class _Flight:
+    """An in-flight request shared by every caller with the same key"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.waiters = 0
+        # Streamed chunks so far, replayed to callers that join late
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def publish(self):
+        """Wake every caller waiting for the next chunk"""
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+class SingleFlight:
+    """Coalesce concurrent identical requests into one in-flight call
+
+    All methods must be used from the same event loop (the service's I/O loop).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call() once for all concurrent callers with the same key"""
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(call())
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            self._calls[key] = flight
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # Shield so one caller giving up does not cancel the call for the rest
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._calls, key, flight)
+                flight.task.cancel()
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Iterate open_stream() once and fan its items out to all concurrent callers with the same key"""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, open_stream()))
+            self._streams[key] = flight
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            position = 0
+            while True:
+                if position < len(flight.chunks):
+                    yield flight.chunks[position]
+                    position += 1
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.changed.wait()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _Flight, stream: AsyncIterator[Any]):
+        """Read the shared stream and publish each item"""
+        try:
+            async for item in stream:
+                flight.chunks.append(item)
+                flight.publish()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._forget(self._streams, key, flight)
+            flight.publish()
+
+    def _forget(self, flights: Dict[str, _Flight], key: str, flight: _Flight):
+        """Stop routing new callers to a finished flight"""
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counts of leading and coalesced calls"""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams)
+        }
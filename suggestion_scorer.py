@@ -0,0 +1,171 @@
+"""Rubric that decides how the persona rates a suggestion
+
+Live turns score one suggestion at a time; offline runs re-score archived
+suggestions in batches when the rubric is tuned:
+
+    python suggestion_scorer.py sessions.db --seed 0
+"""
+import argparse
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from models import ResponseStatus
+
+# Words that show a suggestion gives concrete guidance
+SPECIFIC_TERMS = ('step', 'how', 'guide', 'tutorial', 'example', 'feature', 'setting', 'configure')
+
+# Rubric tiers, from least to most helpful
+TIER_WEAK = 0
+TIER_PARTIAL = 1
+TIER_STRONG = 2
+
+# tier -> (status when the draw is above the cutoff, status otherwise, cutoff)
+STATUS_POLICY: Dict[int, Tuple[str, str, float]] = {
+    TIER_STRONG: ('satisfied', 'needs_more', 0.3),
+    TIER_PARTIAL: ('needs_more', 'satisfied', 0.5),
+    TIER_WEAK: ('unclear', 'needs_more', 0.7)
+}
+
+STATUSES = tuple(status.value for status in ResponseStatus)
+
+@dataclass
+class SuggestionScores:
+    """Features, tier and status of each suggestion in a batch, as parallel arrays"""
+    length: np.ndarray
+    term_hits: np.ndarray
+    mentions_product: np.ndarray
+    tier: np.ndarray
+    status: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+class SuggestionScorer:
+    """Scores suggestions on length, concrete terms and product mentions, then draws a status
+
+    The terms are compiled into one case-insensitive regex, so each
+    suggestion is scanned once however many terms there are, and the tier
+    and status rules run as array operations over the whole batch. Terms
+    match anywhere in a word, as a substring test would. The status draw
+    takes its random numbers from the caller, so a seeded service or a
+    seeded offline run gives the same statuses every time.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str] = SPECIFIC_TERMS,
+        long_length: int = 100,
+        medium_length: int = 50,
+        policy: Optional[Dict[int, Tuple[str, str, float]]] = None
+    ):
+        self.terms = tuple(terms)
+        self.long_length = long_length
+        self.medium_length = medium_length
+        self.policy = policy or STATUS_POLICY
+        self._terms = re.compile("|".join(re.escape(term) for term in self.terms), re.IGNORECASE)
+
+        tiers = sorted(self.policy)
+        codes = {status: code for code, status in enumerate(STATUSES)}
+        self._above = np.array([codes[self.policy[tier][0]] for tier in tiers])
+        self._below = np.array([codes[self.policy[tier][1]] for tier in tiers])
+        self._cutoffs = np.array([self.policy[tier][2] for tier in tiers])
+        self._statuses = np.array(STATUSES)
+
+    def features(
+        self,
+        suggestions: Sequence[str],
+        products: Union[str, Sequence[str]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(length, term hits, mentions product) for each suggestion
+
+        ``products`` is one product for the whole batch or one per suggestion.
+        """
+        count = len(suggestions)
+        if isinstance(products, str):
+            products = [products] * count
+        length = np.fromiter(map(len, suggestions), dtype=np.int64, count=count)
+        term_hits = np.fromiter((len(self._terms.findall(text)) for text in suggestions), dtype=np.int64, count=count)
+
+        lowered_products: Dict[str, str] = {}
+        mentions_product = np.zeros(count, dtype=bool)
+        for index, (text, product) in enumerate(zip(suggestions, products)):
+            lowered = lowered_products.get(product)
+            if lowered is None:
+                lowered = lowered_products[product] = product.lower()
+            mentions_product[index] = lowered in text.lower()
+        return length, term_hits, mentions_product
+
+    def tiers(self, length: np.ndarray, term_hits: np.ndarray, mentions_product: np.ndarray) -> np.ndarray:
+        """Rubric tier of each suggestion"""
+        has_terms = term_hits > 0
+        return np.select(
+            [
+                (length > self.long_length) & has_terms & mentions_product,
+                (length > self.medium_length) & (has_terms | mentions_product)
+            ],
+            [TIER_STRONG, TIER_PARTIAL],
+            TIER_WEAK
+        )
+
+    def statuses(self, tiers: np.ndarray, draws: np.ndarray) -> np.ndarray:
+        """Status of each suggestion for uniform draws in [0, 1)"""
+        codes = np.where(draws > self._cutoffs[tiers], self._above[tiers], self._below[tiers])
+        return self._statuses[codes]
+
+    def score_batch(
+        self,
+        suggestions: Sequence[str],
+        products: Union[str, Sequence[str]],
+        seed: Optional[int] = None
+    ) -> SuggestionScores:
+        """Score a batch of suggestions, drawing statuses from a generator seeded with ``seed``"""
+        length, term_hits, mentions_product = self.features(suggestions, products)
+        tiers = self.tiers(length, term_hits, mentions_product)
+        draws = np.random.default_rng(seed).random(len(suggestions))
+        return SuggestionScores(length, term_hits, mentions_product, tiers, self.statuses(tiers, draws))
+
+    def assess(self, suggestion: str, product: str, rng) -> str:
+        """Status of one suggestion, taking the draw from ``rng.random()``"""
+        length, term_hits, mentions_product = self.features([suggestion], product)
+        tiers = self.tiers(length, term_hits, mentions_product)
+        return str(self.statuses(tiers, np.array([rng.random()]))[0])
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score every stored suggestion with the current rubric")
+    parser.add_argument("db_path", nargs="?", default="sessions.db", help="Session database to read")
+    parser.add_argument("--seed", type=int, help="Seed for the status draws")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Suggestions scored per batch")
+    args = parser.parse_args()
+
+    # Imported here so the scorer itself has no storage dependency
+    from session_store import SessionStore
+
+    store = SessionStore(args.db_path)
+    scorer = SuggestionScorer()
+    rng = np.random.default_rng(args.seed)
+    tiers: Counter = Counter()
+    statuses: Counter = Counter()
+    try:
+        for batch in store.iter_suggestions(args.batch_size):
+            contents = [content for content, _ in batch]
+            length, term_hits, mentions_product = scorer.features(contents, [product for _, product in batch])
+            batch_tiers = scorer.tiers(length, term_hits, mentions_product)
+            tiers.update(batch_tiers.tolist())
+            statuses.update(scorer.statuses(batch_tiers, rng.random(len(batch))).tolist())
+    finally:
+        store.close()
+
+    total = sum(statuses.values())
+    print(f"Suggestions: {total}")
+    names = {TIER_STRONG: "strong", TIER_PARTIAL: "partial", TIER_WEAK: "weak"}
+    for tier in sorted(names, reverse=True):
+        print(f"  {names[tier]:>10}: {tiers[tier]} ({tiers[tier] / total if total else 0.0:.1%})")
+    for status in STATUSES:
+        print(f"  {status:>10}: {statuses[status]} ({statuses[status] / total if total else 0.0:.1%})")
+
+if __name__ == "__main__":
+    main()
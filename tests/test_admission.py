@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionScheduler, AdmissionRejected, PRIORITY_TURN, PRIORITY_OPENING, PRIORITY_BACKGROUND
+
+async def hold(scheduler: AdmissionScheduler, seconds: float, priority: int = PRIORITY_TURN):
+    async with scheduler.slot(priority):
+        await asyncio.sleep(seconds)
+
+def test_queued_calls_are_admitted_by_priority_then_arrival():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        await scheduler.acquire()
+        order = []
+
+        async def queued(name: str, priority: int):
+            await scheduler.acquire(priority)
+            order.append(name)
+            scheduler.release()
+
+        waiters = []
+        for name, priority in [("opening", PRIORITY_OPENING), ("summary", PRIORITY_BACKGROUND),
+                               ("turn-1", PRIORITY_TURN), ("turn-2", PRIORITY_TURN)]:
+            waiters.append(asyncio.ensure_future(queued(name, priority)))
+            await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*waiters)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(run())
+    assert order == ["turn-1", "turn-2", "opening", "summary"]
+    assert scheduler.active == 0
+
+def test_full_queue_rejects():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1, max_queue=1)
+        await scheduler.acquire()
+        waiter = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected, match="queue full"):
+            await scheduler.acquire()
+        scheduler.release()
+        await waiter
+        scheduler.release()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.rejected == 1
+    assert scheduler.active == 0
+
+def test_queue_deadline_rejects():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1, queue_timeout=0.05)
+        await scheduler.acquire()
+        with pytest.raises(AdmissionRejected, match="Queued longer"):
+            await scheduler.acquire()
+        scheduler.release()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.rejected == 1
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+def test_estimated_wait_past_deadline_rejects_without_queueing():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1, queue_timeout=1.0)
+        scheduler._service_time = 5.0
+        await scheduler.acquire()
+        with pytest.raises(AdmissionRejected, match="Estimated queue wait"):
+            await scheduler.acquire()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.queue_depth == 0
+
+def test_slow_service_time_still_queues_when_slots_free_in_time():
+    # Four slots held for staggered times free one every 0.03s; the average
+    # hold is longer than the deadline, but the next call only waits for one
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=4, queue_timeout=0.1)
+        scheduler._service_time = 0.12
+        holders = [asyncio.ensure_future(hold(scheduler, 0.03 * (i + 1))) for i in range(4)]
+        await asyncio.sleep(0.005)
+        await scheduler.acquire()
+        scheduler.release()
+        await asyncio.gather(*holders)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.rejected == 0
+    assert scheduler.active == 0
+
+def test_abandon_hands_back_a_slot_granted_at_the_same_moment():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        await scheduler.acquire()
+        future = asyncio.get_running_loop().create_future()
+        # The slot was handed over just as the waiter gave up
+        future.set_result(None)
+        scheduler._abandon(future)
+        return scheduler
+
+    assert asyncio.run(run()).active == 0
+
+def test_cancelled_waiter_racing_a_release_does_not_leak_the_slot():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        await scheduler.acquire()
+        waiter = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0)
+        # Hand the slot over and cancel the waiter before it can run
+        scheduler.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        else:
+            scheduler.release()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        await scheduler.acquire()
+        waiter = asyncio.ensure_future(scheduler.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        depth = scheduler.queue_depth
+        scheduler.release()
+        return scheduler, depth
+
+    scheduler, depth = asyncio.run(run())
+    assert depth == 0
+    assert scheduler.active == 0
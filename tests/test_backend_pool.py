@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import List, Tuple
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllamaConfig, start_fake_ollama
+from backend_pool import BackendPool
+from circuit_breaker import CircuitOpen
+from generation_cache import GenerationCache
+from models import MessageType
+from ollama_service import OllamaService
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from semantic_cache import SemanticCache
+from transcript import Transcript
+
+CALLS = 24
+LATENCY = 0.2
+
+async def run_calls(hosts: int) -> Tuple[float, List[int]]:
+    """Run concurrent uncached calls against stand-in servers on separate ports; returns (seconds, requests per host)"""
+    servers = [await start_fake_ollama(FakeOllamaConfig(latency=LATENCY, token_rate=0.0)) for _ in range(hosts)]
+    service = OllamaService(
+        backends=[url for _, url in servers],
+        cache=GenerationCache(max_entries=0),
+        semantic_cache=SemanticCache(max_entries_per_scope=0),
+        health_check_interval=0
+    )
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(service.call_ollama(f"Prompt {i}", "System", use_cache=False) for i in range(CALLS)))
+        duration = time.perf_counter() - start
+        return duration, [backend.requests for backend in service.backends.backends]
+    finally:
+        service.close()
+        for runner, _ in servers:
+            await runner.cleanup()
+
+def test_capacity_scales_with_hosts_and_weights():
+    assert BackendPool(["http://a"]).capacity(4) == 4
+    assert BackendPool(["http://a", "http://b", "http://c"]).capacity(4) == 12
+    assert BackendPool.from_spec("http://a=2,http://b").capacity(4) == 12
+
+def test_scheduler_is_sized_from_pool():
+    service = OllamaService(backends=["http://a", "http://b"], slots_per_backend=3, health_check_interval=0)
+    assert service.scheduler.max_concurrent == 6
+
+def test_routing_spreads_load_evenly():
+    _, requests = asyncio.run(run_calls(3))
+    assert requests == [CALLS // 3] * 3
+
+def test_throughput_scales_across_hosts():
+    single, _ = asyncio.run(run_calls(1))
+    triple, _ = asyncio.run(run_calls(3))
+    # 4 slots per host: six rounds of calls on one host, two on three
+    assert single >= 6 * LATENCY
+    assert triple < single / 2
+
+def test_skipped_generation_counts_one_short_circuit_per_backend():
+    service = OllamaService(
+        backends=["http://127.0.0.1:9", "http://127.0.0.1:10"],
+        embedding_model="fake-embed",
+        health_check_interval=0
+    )
+    for backend in service.backends.backends:
+        for _ in range(backend.breaker.failure_threshold):
+            backend.breaker.record_failure()
+    history = Transcript()
+    history.add(MessageType.PERSONA_QUESTION, "How do I get started?")
+    history.add(MessageType.USER_SUGGESTION, "Open the settings and configure your workspace step by step.")
+    try:
+        assert not service.backends.available()
+        assert not service.backends.available()
+        assert [b.breaker.short_circuited for b in service.backends.backends] == [0, 0]
+
+        # Embeds the suggestion, then skips the generation
+        asyncio.run(service.generate_persona_response(SAMPLE_PERSONAS[0], SAMPLE_COMPANIES[0], history, session_id="s"))
+        assert [b.breaker.short_circuited for b in service.backends.backends] == [1, 1]
+
+        with pytest.raises(CircuitOpen):
+            asyncio.run(service.call_ollama("Prompt", "System", use_cache=False))
+        assert [b.breaker.short_circuited for b in service.backends.backends] == [2, 2]
+    finally:
+        service.close()
@@ -0,0 +1,37 @@
+import asyncio
+from typing import List
+
+from benchmarks.fake_ollama import FakeOllamaConfig, start_fake_ollama
+from models import MessageType
+from ollama_service import OllamaService
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from transcript import Transcript
+
+PERSONA = SAMPLE_PERSONAS[0]
+COMPANY = SAMPLE_COMPANIES[0]
+
+async def turn_prompts(stream: bool) -> List[str]:
+    """Run one needs-more turn with an embedding model set; returns the session's prompts in history order"""
+    runner, url = await start_fake_ollama(FakeOllamaConfig(latency=0.02))
+    service = OllamaService(backends=[url], embedding_model="fake-embed", health_check_interval=0)
+    service.scorer.assess = lambda *args: 'needs_more'
+    history = Transcript()
+    history.add(MessageType.PERSONA_QUESTION, "How do I get started?")
+    history.add(MessageType.USER_SUGGESTION, "Open the settings and configure your workspace step by step.")
+    try:
+        if stream:
+            async for _ in service.stream_turn(PERSONA, COMPANY, history, session_id="s"):
+                pass
+        else:
+            await service.generate_turn(PERSONA, COMPANY, history, session_id="s")
+        return [exchange.prompt for exchange in service.chat_sessions.get("s", service._session_context(PERSONA, COMPANY)).exchanges]
+    finally:
+        service.close()
+        await runner.cleanup()
+
+def test_response_keeps_its_place_ahead_of_follow_up():
+    for stream in (False, True):
+        prompts = asyncio.run(turn_prompts(stream))
+        assert len(prompts) == 2
+        assert prompts[0].startswith("Respond to this suggestion")
+        assert "follow-up question" in prompts[1]
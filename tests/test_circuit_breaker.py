@@ -0,0 +1,71 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+def test_trips_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow()
+    assert breaker.short_circuited == 1
+
+def test_half_open_allows_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=2.0)
+    breaker.record_failure()
+    clock.now += 2.0
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+def test_unanswered_trial_is_retried_after_backoff(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=2.0)
+    breaker.record_failure()
+    clock.now += 2.0
+    assert breaker.allow()
+    clock.now += 1.0
+    assert not breaker.allow()
+    clock.now += 1.0
+    assert breaker.allow()
+
+def test_failed_trials_double_the_backoff_up_to_the_cap(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=2.0, max_reset_timeout=10.0)
+    breaker.record_failure()
+    delays = []
+    for _ in range(4):
+        delays.append(breaker.next_probe_delay(15.0))
+        clock.now += delays[-1]
+        assert breaker.allow()
+        breaker.record_failure()
+    assert delays == [2.0, 4.0, 8.0, 10.0]
+    assert breaker.trips == 1
+
+    breaker.record_success()
+    assert breaker.stats()["backoff"] == 2.0
+    assert breaker.next_probe_delay(15.0) == 15.0
@@ -0,0 +1,64 @@
+import random
+from typing import List, Optional
+
+from company_catalog import CompanyCatalog
+from models import Company
+from sample_data import SAMPLE_COMPANIES
+
+WORDS = ["Cloud", "data", "Sync", "flow", "CRM", "desk", "analytics", "Hub", "team", "pay", "AI", "ops", "mail", "Go"]
+CATEGORIES = ["Productivity", "Finance", "Sales", "Support"]
+
+def make_catalog(size: int, rng: random.Random) -> List[Company]:
+    def words(count: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(count))
+    return [
+        Company(
+            id=str(i),
+            name=words(rng.randint(1, 3)),
+            product=words(rng.randint(1, 2)),
+            description=words(rng.randint(0, 12)),
+            category=rng.choice(CATEGORIES)
+        )
+        for i in range(size)
+    ]
+
+def substring_filter(companies: List[Company], query: str, category: Optional[str]) -> List[str]:
+    """The selector's filter before the catalog was indexed"""
+    matches = [
+        c for c in companies
+        if query.lower() in c.name.lower() or query.lower() in c.product.lower() or query.lower() in c.description.lower()
+    ]
+    if category is not None:
+        matches = [c for c in matches if c.category == category]
+    return sorted(c.id for c in matches)
+
+def search_ids(catalog: CompanyCatalog, query: str, category: Optional[str]) -> List[str]:
+    ids = [c.id for c in catalog.search(query, category)]
+    assert len(ids) == len(set(ids))
+    return sorted(ids)
+
+def test_search_matches_substring_filter():
+    rng = random.Random(0)
+    companies = make_catalog(1000, rng)
+    catalog = CompanyCatalog(companies)
+    text = " ".join(f"{c.name} {c.product} {c.description}" for c in companies[:200])
+
+    queries = ["", "a", "Go", "ai", "d", "zz", "cloud", "CLOUD SYNC", "nothing like this", "qqq"]
+    for _ in range(200):
+        # Slices of real text, including across word boundaries, of 1 to 8 characters
+        start = rng.randrange(len(text) - 8)
+        queries.append(text[start:start + rng.randint(1, 8)].strip() or "a")
+
+    for query in queries:
+        for category in [None] + CATEGORIES:
+            assert search_ids(catalog, query, category) == substring_filter(companies, query, category), (query, category)
+
+def test_query_with_no_hits_returns_nothing():
+    catalog = CompanyCatalog(SAMPLE_COMPANIES)
+    assert catalog.search("no company is called this") == []
+    assert catalog.search("xq") == []
+
+def test_unknown_category_returns_nothing():
+    catalog = CompanyCatalog(SAMPLE_COMPANIES)
+    assert catalog.search("", "Not a category") == []
+    assert catalog.search("a", "Not a category") == []
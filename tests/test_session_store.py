@@ -0,0 +1,48 @@
+import pytest
+
+from models import MessageType
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from session_store import SessionStore, StoredTranscript, TranscriptConflict
+
+@pytest.fixture
+def store(tmp_path) -> SessionStore:
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.create_session("s", SAMPLE_PERSONAS[0], SAMPLE_COMPANIES[0])
+    yield store
+    store.close()
+
+def test_second_writer_gets_a_conflict_and_nothing_is_written(store):
+    first = StoredTranscript(store, "s")
+    first.add(MessageType.PERSONA_QUESTION, "How do I start?")
+    # The same session open in another tab
+    second = StoredTranscript(store, "s")
+
+    first.add(MessageType.USER_SUGGESTION, "From the first tab")
+    with pytest.raises(TranscriptConflict):
+        second.add(MessageType.USER_SUGGESTION, "From the second tab")
+
+    assert len(second) == 1
+    assert second.last_suggestion is None
+    assert store.load_session("s").message_count == 2
+    assert [m.content for m in StoredTranscript(store, "s")] == ["How do I start?", "From the first tab"]
+
+def test_resume_with_small_window_pages_older_messages_from_the_store(store):
+    transcript = StoredTranscript(store, "s", window=3)
+    for i in range(5):
+        transcript.add(MessageType.PERSONA_QUESTION, f"Question {i}")
+        transcript.add(MessageType.USER_SUGGESTION, f"Suggestion {i}")
+    transcript.add(MessageType.PERSONA_QUESTION, "Question 5")
+
+    resumed = StoredTranscript(store, "s", window=3)
+    assert len(resumed) == 11
+    assert len(resumed._contents) == 3
+    assert resumed.question_count == 6
+    assert resumed.last_question.content == "Question 5"
+    assert resumed.last_question.id == 11
+    assert resumed.last_suggestion.content == "Suggestion 4"
+    assert [m.content for m in resumed.page(0, 2)] == ["Question 0", "Suggestion 0"]
+    assert [m.id for m in resumed.page(6, 11)] == [7, 8, 9, 10, 11]
+    assert [m.content for m in resumed] == [m.content for m in transcript]
+
+    resumed.add(MessageType.USER_SUGGESTION, "Suggestion 5")
+    assert resumed.last_suggestion.id == 12
@@ -0,0 +1,8 @@
+from simulator import percentile
+
+def test_percentile_is_nearest_rank():
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([5, 1, 3], 100) == 5
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_leader():
+    async def run():
+        flights = SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "reply"
+
+        results = await asyncio.gather(*(flights.do("key", call) for _ in range(5)))
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(run())
+    assert calls == 1
+    assert results == ["reply"] * 5
+    assert flights.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "reply"
+
+        first = asyncio.ensure_future(flights.do("key", call))
+        second = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second
+
+    first, result = asyncio.run(run())
+    assert first.cancelled()
+    assert result == "reply"
+
+def test_call_error_reaches_every_waiter():
+    async def run():
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("backend failed")
+
+        return await asyncio.gather(*(flights.do("key", call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+async def gated_stream(gate: asyncio.Event, opened: list):
+    opened.append(True)
+    yield "a"
+    yield "b"
+    await gate.wait()
+    yield "c"
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+def test_late_joiner_replays_chunks_streamed_so_far():
+    async def run():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+        opened = []
+
+        early = asyncio.ensure_future(collect(flights.stream("key", lambda: gated_stream(gate, opened))))
+        # Let the shared stream produce its first chunks before the second caller joins
+        for _ in range(5):
+            await asyncio.sleep(0)
+        late = asyncio.ensure_future(collect(flights.stream("key", lambda: gated_stream(gate, opened))))
+        await asyncio.sleep(0)
+        gate.set()
+        return opened, await early, await late, flights
+
+    opened, early, late, flights = asyncio.run(run())
+    assert len(opened) == 1
+    assert early == late == ["a", "b", "c"]
+    assert flights.coalesced == 1
+
+def test_stream_error_reaches_every_waiter():
+    async def failing():
+        yield "a"
+        await asyncio.sleep(0.01)
+        raise ValueError("stream broke")
+
+    async def run():
+        flights = SingleFlight()
+        return await asyncio.gather(
+            *(collect(flights.stream("key", failing)) for _ in range(2)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_cancelled_stream_waiter_does_not_stop_the_shared_stream():
+    async def run():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+        opened = []
+
+        first = asyncio.ensure_future(collect(flights.stream("key", lambda: gated_stream(gate, opened))))
+        second = asyncio.ensure_future(collect(flights.stream("key", lambda: gated_stream(gate, opened))))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return first, await second
+
+    first, chunks = asyncio.run(run())
+    assert first.cancelled()
+    assert chunks == ["a", "b", "c"]
+
+def test_last_waiter_leaving_cancels_the_call():
+    async def run():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiter = asyncio.ensure_future(flights.do("key", call))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return cancelled, flights
+
+    cancelled, flights = asyncio.run(run())
+    assert cancelled == [True]
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,46 @@
+import random
+
+from sample_data import SAMPLE_COMPANIES
+from suggestion_scorer import SuggestionScorer
+
+WORDS = [
+    "open", "the", "Step", "HOW", "guide", "Tutorials", "example", "features", "settings",
+    "reconfigure", "click", "menu", "then", "team", "dashboard", "report", "first", "docs"
+]
+
+def inline_rubric(content: str, product: str, rng: random.Random) -> str:
+    """The rubric as it was written inline in OllamaService before SuggestionScorer"""
+    suggestion_length = len(content)
+    has_specific_terms = any(term in content.lower() for term in
+                             ['step', 'how', 'guide', 'tutorial', 'example', 'feature', 'setting', 'configure'])
+    mentions_product = product.lower() in content.lower()
+
+    if suggestion_length > 100 and has_specific_terms and mentions_product:
+        return 'satisfied' if rng.random() > 0.3 else 'needs_more'
+    elif suggestion_length > 50 and (has_specific_terms or mentions_product):
+        return 'needs_more' if rng.random() > 0.5 else 'satisfied'
+    else:
+        return 'unclear' if rng.random() > 0.7 else 'needs_more'
+
+def random_suggestion(rng: random.Random, product: str) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(0, 30))]
+    if rng.random() < 0.5:
+        words.insert(rng.randint(0, len(words)), rng.choice([product, product.upper(), product.lower()]))
+    return " ".join(words)
+
+def test_assess_matches_the_inline_rubric_for_equal_seeds():
+    scorer = SuggestionScorer()
+    cases = random.Random(0)
+    for seed in range(5000):
+        product = cases.choice(SAMPLE_COMPANIES).product
+        suggestion = random_suggestion(cases, product)
+        assert scorer.assess(suggestion, product, random.Random(seed)) == inline_rubric(suggestion, product, random.Random(seed)), suggestion
+
+def test_boundary_lengths_match_the_inline_rubric():
+    scorer = SuggestionScorer()
+    product = SAMPLE_COMPANIES[0].product
+    for length in (49, 50, 51, 99, 100, 101):
+        for prefix in ("step ", product + " ", "plain "):
+            suggestion = (prefix + "x" * length)[:length]
+            for seed in range(20):
+                assert scorer.assess(suggestion, product, random.Random(seed)) == inline_rubric(suggestion, product, random.Random(seed))
@@ -0,0 +1,53 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from models import MessageType
+from sample_data import SAMPLE_COMPANIES, SAMPLE_PERSONAS
+from session_store import SessionStore, StoredTranscript
+from transcript_export import export
+
+@pytest.fixture
+def store(tmp_path) -> SessionStore:
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+def add_session(store: SessionStore, session_id: str, messages: int):
+    store.create_session(session_id, SAMPLE_PERSONAS[0], SAMPLE_COMPANIES[0])
+    transcript = StoredTranscript(store, session_id)
+    for i in range(messages):
+        transcript.add(MessageType.USER_SUGGESTION, f"{session_id} message {i}")
+
+def read_rows(path: str, fmt: str, compress: bool):
+    opener = gzip.open if compress else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if fmt == "jsonl":
+            return [json.loads(line) for line in f]
+        return list(csv.DictReader(f))
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+@pytest.mark.parametrize("compress", [False, True])
+def test_cursor_exports_only_messages_written_since_last_run(store, tmp_path, fmt, compress):
+    cursor = str(tmp_path / "export.cursor")
+    first_path = str(tmp_path / f"first.{fmt}")
+    second_path = str(tmp_path / f"second.{fmt}")
+
+    add_session(store, "a", 3)
+    assert export(store, first_path, fmt, compress, cursor, batch_size=2) == 3
+
+    # New messages in an existing session and in a new one
+    StoredTranscript(store, "a").add(MessageType.PERSONA_RESPONSE, "a reply")
+    add_session(store, "b", 2)
+    assert export(store, second_path, fmt, compress, cursor, batch_size=2) == 3
+
+    first = read_rows(first_path, fmt, compress)
+    second = read_rows(second_path, fmt, compress)
+    assert [row["content"] for row in first] == ["a message 0", "a message 1", "a message 2"]
+    assert [row["content"] for row in second] == ["a reply", "b message 0", "b message 1"]
+    assert [str(row["message_id"]) for row in second] == ["4", "1", "2"]
+    assert second[0]["company_name"] == SAMPLE_COMPANIES[0].name
+
+    assert export(store, str(tmp_path / f"third.{fmt}"), fmt, compress, cursor) == 0
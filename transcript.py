@@ -0,0 +1,116 @@
+import time
+from array import array
+from typing import Iterator, List, Optional, Union
+from models import Message, MessageType, ResponseStatus
+
+# Column codes; status code 0 means no status
+MESSAGE_TYPES = list(MessageType)
+RESPONSE_STATUSES = [None] + list(ResponseStatus)
+TYPE_CODES = {message_type: code for code, message_type in enumerate(MESSAGE_TYPES)}
+STATUS_CODES = {status: code for code, status in enumerate(RESPONSE_STATUSES)}
+
+class Transcript:
+    """Append-only conversation stored column-wise, with the counts and pointers turns need
+
+    Types and statuses are kept as one-byte codes and creation times as
+    doubles in arrays, so a long session costs little more than its text;
+    Message objects are only built when read. Question tiers depend on how
+    many questions were asked, and responses on the latest question and
+    suggestion; tracking counts and the latest message of each type on
+    append keeps every turn O(1) however long the session runs. Ids are
+    assigned here, counting up from 1.
+
+    The columns hold messages from ``_offset`` on; subclasses backed by a
+    store keep only a recent window in memory and read older pages on demand.
+    """
+
+    def __init__(self):
+        self._types = array('b')
+        self._statuses = array('b')
+        self._created = array('d')
+        self._contents: List[str] = []
+        self._offset = 0
+        self._counts = [0] * len(MESSAGE_TYPES)
+        # Index of the latest message of each type, -1 if none
+        self._last = [-1] * len(MESSAGE_TYPES)
+
+    def add(
+        self,
+        message_type: Union[MessageType, str],
+        content: str,
+        status: Optional[Union[ResponseStatus, str]] = None
+    ) -> Message:
+        """Append a message and return it with its assigned id"""
+        type_code = TYPE_CODES[MessageType(message_type)]
+        status_code = STATUS_CODES[ResponseStatus(status) if status is not None else None]
+        self._append(type_code, status_code, time.time(), content)
+        return self._message(len(self) - 1)
+
+    def _append_columns(self, type_code: int, status_code: int, created: float, content: str):
+        self._types.append(type_code)
+        self._statuses.append(status_code)
+        self._created.append(created)
+        self._contents.append(content)
+
+    def _append(self, type_code: int, status_code: int, created: float, content: str):
+        """Add a message's columns and update the counts and pointers"""
+        self._append_columns(type_code, status_code, created, content)
+        self._counts[type_code] += 1
+        self._last[type_code] = len(self) - 1
+
+    def _message(self, index: int) -> Message:
+        local = index - self._offset
+        return Message(
+            id=index + 1,
+            type=MESSAGE_TYPES[self._types[local]],
+            content=self._contents[local],
+            status=RESPONSE_STATUSES[self._statuses[local]],
+            created=self._created[local]
+        )
+
+    def page(self, start: int, stop: int) -> List[Message]:
+        """Messages with indexes in [start, stop)"""
+        return [self._message(index) for index in range(max(start, 0), min(stop, len(self)))]
+
+    def count(self, message_type: Union[MessageType, str]) -> int:
+        """Number of messages of a type"""
+        return self._counts[TYPE_CODES[MessageType(message_type)]]
+
+    @property
+    def question_count(self) -> int:
+        return self.count(MessageType.PERSONA_QUESTION)
+
+    def last(self, message_type: Union[MessageType, str]) -> Optional[Message]:
+        """Latest message of a type"""
+        index = self._last[TYPE_CODES[MessageType(message_type)]]
+        return self._message(index) if index >= 0 else None
+
+    @property
+    def last_suggestion(self) -> Optional[Message]:
+        return self.last(MessageType.USER_SUGGESTION)
+
+    @property
+    def last_question(self) -> Optional[Message]:
+        return self.last(MessageType.PERSONA_QUESTION)
+
+    def __len__(self) -> int:
+        return self._offset + len(self._contents)
+
+    def __iter__(self) -> Iterator[Message]:
+        for index in range(len(self)):
+            yield self._message(index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self.page(start, stop)
+            return [self._message(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transcript index out of range")
+        return self._message(index)
+
+# Persona methods accept a Transcript, or a plain list that they scan
+MessageHistory = Union[Transcript, List[Message]]
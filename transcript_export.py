@@ -0,0 +1,228 @@
+"""Streaming export of stored transcripts for analytics
+
+Writes one row per message, with its session's persona and company, as
+JSON lines, CSV or Parquet. Messages are read from the session database in
+pages and written as they arrive, so memory stays constant however many
+sessions there are. With a cursor file, each run exports only the messages
+written since the previous one:
+
+    python transcript_export.py sessions.db --output messages.jsonl.gz --gzip --cursor export.cursor
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from models import Persona, Company, Message
+from session_store import SessionStore
+from transcript import MESSAGE_TYPES, RESPONSE_STATUSES
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+# Columns of every exported row, in order
+FIELDS = [
+    "session_id", "message_id", "type", "status", "content", "created",
+    "persona_id", "persona_name", "persona_role", "persona_expertise",
+    "company_id", "company_name", "product", "category"
+]
+
+# Parsed personas and companies kept while streaming; sessions share few of them
+MAX_CACHED_RECORDS = 4096
+
+@dataclass
+class ExportCursor:
+    """Insert id of the last exported message; messages are exported in the order they were written"""
+    message_id: int = 0
+
+    @classmethod
+    def load(cls, path: str) -> "ExportCursor":
+        """Read a cursor file, or start from the beginning if there is none"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str):
+        """Write the cursor atomically, so an interrupted save keeps the previous position"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(temp_path, path)
+
+@dataclass
+class ExportRecord:
+    """One message with the session it belongs to"""
+    session_id: str
+    persona: Persona
+    company: Company
+    message: Message
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "message_id": self.message.id,
+            "type": self.message.type.value,
+            "status": self.message.status.value if self.message.status is not None else None,
+            "content": self.message.content,
+            "created": self.message.created,
+            "persona_id": self.persona.id,
+            "persona_name": self.persona.name,
+            "persona_role": self.persona.role,
+            "persona_expertise": ", ".join(self.persona.expertise),
+            "company_id": self.company.id,
+            "company_name": self.company.name,
+            "product": self.company.product,
+            "category": self.company.category
+        }
+
+def iter_records(
+    store: SessionStore,
+    cursor: Optional[ExportCursor] = None,
+    batch_size: int = 1000
+) -> Iterator[ExportRecord]:
+    """Stream every message after the cursor in the order they were written, moving the cursor past each one yielded"""
+    cursor = cursor if cursor is not None else ExportCursor()
+    personas: Dict[int, Persona] = {}
+    companies: Dict[int, Company] = {}
+
+    for rows in store.iter_message_rows(cursor.message_id, batch_size):
+        for message_id, session_id, seq, type_code, status_code, content, created, persona_rowid, persona_data, company_rowid, company_data in rows:
+            persona = personas.get(persona_rowid)
+            if persona is None:
+                if len(personas) >= MAX_CACHED_RECORDS:
+                    personas.clear()
+                persona = personas[persona_rowid] = Persona(**json.loads(persona_data))
+            company = companies.get(company_rowid)
+            if company is None:
+                if len(companies) >= MAX_CACHED_RECORDS:
+                    companies.clear()
+                company = companies[company_rowid] = Company(**json.loads(company_data))
+
+            message = Message(
+                id=seq,
+                type=MESSAGE_TYPES[type_code],
+                content=content,
+                status=RESPONSE_STATUSES[status_code],
+                created=created
+            )
+            yield ExportRecord(session_id, persona, company, message)
+            cursor.message_id = message_id
+
+def write_jsonl(records: Iterable[ExportRecord], f: TextIO) -> int:
+    """Write records as JSON lines, returning how many were written"""
+    count = 0
+    for record in records:
+        f.write(json.dumps(record.to_row(), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+def write_csv(records: Iterable[ExportRecord], f: TextIO) -> int:
+    """Write records as CSV with a header row, returning how many were written"""
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record.to_row())
+        count += 1
+    return count
+
+def write_parquet(records: Iterable[ExportRecord], path: str, compression: str = "snappy", row_group_size: int = 10000) -> int:
+    """Write records to a Parquet file one row group at a time, returning how many were written"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = pa.schema([
+        ("session_id", pa.string()),
+        ("message_id", pa.int64()),
+        ("type", pa.string()),
+        ("status", pa.string()),
+        ("content", pa.string()),
+        ("created", pa.float64()),
+        ("persona_id", pa.string()),
+        ("persona_name", pa.string()),
+        ("persona_role", pa.string()),
+        ("persona_expertise", pa.string()),
+        ("company_id", pa.string()),
+        ("company_name", pa.string()),
+        ("product", pa.string()),
+        ("category", pa.string())
+    ])
+
+    count = 0
+    rows: List[Dict[str, Any]] = []
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for record in records:
+            rows.append(record.to_row())
+            if len(rows) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(rows)
+                rows = []
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(rows)
+    return count
+
+def export(
+    store: SessionStore,
+    path: str,
+    fmt: str = "jsonl",
+    compress: bool = False,
+    cursor_path: Optional[str] = None,
+    batch_size: int = 1000
+) -> int:
+    """Export messages to a file, returning how many were written
+
+    With ``cursor_path``, only messages after the saved cursor are exported
+    and the cursor is saved once the file is complete, so a failed run is
+    simply repeated. ``compress`` gzips JSON lines and CSV files; Parquet
+    files use gzip as their internal codec instead, so they stay readable
+    by Parquet tools.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    cursor = ExportCursor.load(cursor_path) if cursor_path else ExportCursor()
+    records = iter_records(store, cursor, batch_size)
+
+    if fmt == "parquet":
+        count = write_parquet(records, path, compression="gzip" if compress else "snappy")
+    else:
+        opener = gzip.open if compress else open
+        with opener(path, "wt", encoding="utf-8", newline="") as f:
+            count = write_jsonl(records, f) if fmt == "jsonl" else write_csv(records, f)
+
+    if cursor_path:
+        cursor.save(cursor_path)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored transcripts for analytics")
+    parser.add_argument("db_path", nargs="?", default="sessions.db", help="Session database to read")
+    parser.add_argument("--output", required=True, help="File to write")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the file extension, else jsonl)")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output")
+    parser.add_argument("--cursor", help="Cursor file; export only messages written since the last run")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Messages read from the database per query")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        name = args.output.lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        fmt = next((f for f in FORMATS if name.endswith(f".{f}")), "jsonl")
+
+    store = SessionStore(args.db_path)
+    try:
+        count = export(store, args.output, fmt, args.gzip, args.cursor, args.batch_size)
+    finally:
+        store.close()
+    print(f"Exported {count} messages to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+class HttpTransport:
+    """Sends requests to Ollama over one pooled aiohttp session
+
+    The session is created lazily on the loop of the first request, so it
+    must only be used from that loop (the service's I/O loop).
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        total_timeout: float = 120.0,
+        max_connections_per_host: int = 16,
+        keepalive_timeout: float = 60.0
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+
+    async def _get_session(self):
+        """Get the pooled client session, creating it if needed
+
+        aiohttp is imported here rather than at module level; it is the
+        slowest import in the app, and the warm-up pays for it on the I/O
+        thread instead of the first render.
+        """
+        if self._session is None or self._session.closed:
+            import aiohttp
+            
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.total_timeout,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a payload and return the JSON reply"""
+        session = await self._get_session()
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                raise Exception(f"Ollama API error: {response.status}")
+            return await response.json()
+
+    async def stream(self, url: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """POST a streaming payload and yield its NDJSON chunks up to the final one"""
+        session = await self._get_session()
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                raise Exception(f"Ollama API error: {response.status}")
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise Exception(f"Ollama API error: {chunk['error']}")
+                yield chunk
+                if chunk.get("done"):
+                    break
+
+    async def healthy(self, url: str) -> bool:
+        """Whether a GET succeeds within the connect timeout"""
+        try:
+            session = await self._get_session()
+            import aiohttp
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.connect_timeout)) as response:
+                return response.status == 200
+        except Exception:
+            return False
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+def _cassette_key(url: str, payload: Dict[str, Any]) -> str:
+    """Match requests by endpoint path and payload, so a cassette replays against any host"""
+    return json.dumps([urlsplit(url).path, payload], sort_keys=True)
+
+class RecordingTransport:
+    """Passes requests through to another transport and appends each exchange to a cassette
+
+    The cassette is JSON lines, one exchange per line: the request, the
+    reply (or streamed chunks with their offsets from the request), the
+    error if it failed, and how long it took.
+    """
+
+    def __init__(self, path: str, inner: Optional[Any] = None):
+        self.path = path
+        self.inner = inner if inner is not None else HttpTransport()
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _write(self, exchange: Dict[str, Any]):
+        with self._lock:
+            self._file.write(json.dumps(exchange) + "\n")
+            self._file.flush()
+
+    async def post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        exchange: Dict[str, Any] = {"endpoint": urlsplit(url).path, "request": payload, "stream": False}
+        started = time.perf_counter()
+        try:
+            exchange["response"] = await self.inner.post(url, payload)
+            return exchange["response"]
+        except Exception as e:
+            exchange["error"] = str(e)
+            raise
+        finally:
+            exchange["elapsed"] = time.perf_counter() - started
+            self._write(exchange)
+
+    async def stream(self, url: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        exchange: Dict[str, Any] = {"endpoint": urlsplit(url).path, "request": payload, "stream": True, "chunks": []}
+        started = time.perf_counter()
+        try:
+            async for chunk in self.inner.stream(url, payload):
+                exchange["chunks"].append([time.perf_counter() - started, chunk])
+                yield chunk
+        except Exception as e:
+            exchange["error"] = str(e)
+            raise
+        finally:
+            exchange["elapsed"] = time.perf_counter() - started
+            # Streams abandoned before the final chunk are not worth replaying
+            if "error" in exchange or (exchange["chunks"] and exchange["chunks"][-1][1].get("done")):
+                self._write(exchange)
+
+    async def healthy(self, url: str) -> bool:
+        return await self.inner.healthy(url)
+
+    async def close(self):
+        await self.inner.close()
+        with self._lock:
+            self._file.close()
+
+class ReplayTransport:
+    """Answers requests from a cassette instead of a model host
+
+    Identical requests replay their recordings in order, repeating the last
+    one once they run out. With ``realtime`` the recorded timings are
+    reproduced; otherwise replies are immediate, which leaves only the
+    app's own overhead to measure.
+    """
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self._exchanges: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self._exchanges[_cassette_key(exchange["endpoint"], exchange["request"])].append(exchange)
+        self.misses = 0
+
+    def _next(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        recordings = self._exchanges.get(_cassette_key(url, payload))
+        if not recordings:
+            self.misses += 1
+            raise Exception(f"No recorded response for {urlsplit(url).path}")
+        return recordings.popleft() if len(recordings) > 1 else recordings[0]
+
+    async def post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        exchange = self._next(url, payload)
+        if self.realtime:
+            await asyncio.sleep(exchange["elapsed"])
+        if "error" in exchange:
+            raise Exception(exchange["error"])
+        return exchange["response"]
+
+    async def stream(self, url: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        exchange = self._next(url, payload)
+        started = time.perf_counter()
+        for offset, chunk in exchange.get("chunks", []):
+            if self.realtime:
+                await asyncio.sleep(max(0.0, offset - (time.perf_counter() - started)))
+            yield chunk
+        if "error" in exchange:
+            if self.realtime:
+                await asyncio.sleep(max(0.0, exchange["elapsed"] - (time.perf_counter() - started)))
+            raise Exception(exchange["error"])
+
+    async def healthy(self, url: str) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+def open_transport(record: Optional[str] = None, replay: Optional[str] = None, realtime: bool = False) -> Optional[Any]:
+    """Transport for command-line record/replay options; None means the default HTTP transport"""
+    if record and replay:
+        raise ValueError("Choose either record or replay")
+    if record:
+        return RecordingTransport(record)
+    if replay:
+        return ReplayTransport(replay, realtime=realtime)
+    return None